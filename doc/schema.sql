@@ -2,3 +2,11 @@ CREATE TABLE user (
     hedwig_id INTEGER PRIMARY KEY,
     omp_id VARCHAR(255)
 );
+
+CREATE TABLE snapshot (
+    refreshed REAL NOT NULL
+);
+
+CREATE TABLE reload (
+    reloaded REAL NOT NULL
+);
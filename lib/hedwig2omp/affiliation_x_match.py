@@ -0,0 +1,283 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import json
+import os
+
+import numpy as np
+
+from hedwig.util import get_logger
+
+from hedwig2omp.columnar import get_table_filename
+
+logger = get_logger(__name__)
+
+nonsense_members = set((
+    'TOP-SCOPE collaborators',
+    'TOPSCOPE collaborators',
+))
+
+state_accepted = 'Accepted'
+
+# Name used for members with no affiliation, as in the proposal list.
+affiliation_unknown = 'Unknown'
+
+
+def read_proposal_list(filename):
+    """
+    Iterate over the proposals in a file written by `write_json_file`.
+
+    Files in the "lines" format are read one proposal at a time.
+    Otherwise the whole file is read and the proposals are
+    yielded in order of proposal code.  (A file in the "compact"
+    format consists of a single line, which is parsed only once.)
+
+    Yields tuples of proposal code and proposal dictionary.
+    """
+
+    with open(filename, 'r') as file_:
+        first_line = file_.readline()
+
+        # An empty file in the "lines" format has no proposals.
+        if not first_line.strip():
+            return
+
+        try:
+            first = json.loads(first_line)
+        except ValueError:
+            first = None
+
+        if (first is not None) and ('proposal_code' in first):
+            yield (first['proposal_code'], first)
+
+            for line in file_:
+                if not line.strip():
+                    continue
+
+                proposal = json.loads(line)
+                yield (proposal['proposal_code'], proposal)
+
+            return
+
+        if first is not None:
+            info = first
+
+        else:
+            file_.seek(0)
+            info = json.load(file_)
+
+    for proposal_code in sorted(info.keys()):
+        yield (proposal_code, info[proposal_code])
+
+
+class AffiliationCrossMatch(object):
+    """
+    Counts of CoI affiliations by PI affiliation, for multiple semesters.
+
+    Affiliation names are mapped to integer indices (in order of first
+    appearance) and each CoI is recorded with the indices of the semester,
+    PI affiliation and CoI affiliation, plus flags for the accepted and
+    student subsets.  The counts are then computed as arrays of shape
+    (semester, PI affiliation, CoI affiliation).
+    """
+
+    def __init__(self):
+        self.semesters = []
+        self.affiliation_names = []
+        self.affiliation_index = {}
+
+        self._semester = []
+        self._pi = []
+        self._coi = []
+        self._accepted = []
+        self._student = []
+
+    def _get_affiliation_index(self, name):
+        if name is None:
+            name = affiliation_unknown
+
+        index = self.affiliation_index.get(name)
+
+        if index is None:
+            index = self.affiliation_index[name] = len(self.affiliation_names)
+            self.affiliation_names.append(name)
+
+        return index
+
+    def add_file(self, filename, semester=None):
+        """
+        Read the given proposal list file as a new semester.
+
+        If no semester name is given, the semester code of the first
+        proposal is used, or the file name if there are no proposals.
+        """
+
+        semester_index = len(self.semesters)
+        n_coi = 0
+
+        for (proposal_code, proposal) in read_proposal_list(filename):
+            if semester is None:
+                semester = proposal.get('semester_code')
+
+            logger.debug(
+                'Reading info for proposal {} ({})',
+                proposal_code, proposal['state'])
+
+            pi_index = self._get_affiliation_index(
+                proposal['member_pi']['affiliation_name'])
+            accepted = (proposal['state'] == state_accepted)
+
+            for coi in proposal['member_cois']:
+                if coi['person_name'] in nonsense_members:
+                    logger.warning(
+                        'Skipping nonsense member "{}"', coi['person_name'])
+                    continue
+
+                self._semester.append(semester_index)
+                self._pi.append(pi_index)
+                self._coi.append(
+                    self._get_affiliation_index(coi['affiliation_name']))
+                self._accepted.append(accepted)
+                self._student.append(bool(coi.get('student')))
+                n_coi += 1
+
+        if semester is None:
+            semester = os.path.basename(filename)
+
+        logger.debug('Read {} CoI(s) for semester {}', n_coi, semester)
+        self.semesters.append(semester)
+
+    def add_columnar(self, directory, semester=None):
+        """
+        Read the given columnar proposal list directory (as written
+        by the `--output-columnar` option) as a new semester.
+
+        Only the required columns of the proposal and member tables
+        are read.
+        """
+
+        semester_index = len(self.semesters)
+
+        with np.load(get_table_filename(directory, 'proposals')) as table:
+            state = table['state']
+            accepted = np.append(table['state_names'], '')[state] == \
+                state_accepted
+
+            if semester is None and len(state):
+                semester = table['semester_code_names'][
+                    table['semester_code'][0]].item()
+
+        with np.load(get_table_filename(directory, 'members')) as table:
+            proposal = table['proposal']
+            pi = table['pi']
+            student = table['student']
+            person_name = table['person_name']
+
+            # Map the affiliation codes to indices, including the
+            # missing value code (-1) as the last entry if present.
+            codes = table['affiliation_name']
+            names = table['affiliation_name_names'].tolist()
+            if (codes < 0).any():
+                names.append(affiliation_unknown)
+
+            mapping = np.array(
+                [self._get_affiliation_index(x) for x in names],
+                dtype=np.intp)
+            affiliation = mapping[codes]
+
+        # The PI is the first member of each proposal.
+        (proposals, first) = np.unique(proposal, return_index=True)
+        first = first[pi[first] == 1]
+
+        pi_index = np.full(len(accepted), -1, dtype=np.intp)
+        pi_index[proposal[first]] = affiliation[first]
+
+        is_coi = np.ones(len(proposal), dtype=bool)
+        is_coi[first] = False
+        is_coi &= (pi_index[proposal] >= 0)
+
+        for name in nonsense_members:
+            nonsense = is_coi & (person_name == name)
+            if nonsense.any():
+                logger.warning('Skipping nonsense member "{}"', name)
+                is_coi &= ~nonsense
+
+        coi = np.nonzero(is_coi)[0]
+
+        self._semester.extend([semester_index] * len(coi))
+        self._pi.extend(pi_index[proposal[coi]].tolist())
+        self._coi.extend(affiliation[coi].tolist())
+        self._accepted.extend(accepted[proposal[coi]].tolist())
+        self._student.extend((student[coi] == 1).tolist())
+
+        if semester is None:
+            semester = os.path.basename(os.path.normpath(directory))
+
+        logger.debug('Read {} CoI(s) for semester {}', len(coi), semester)
+        self.semesters.append(semester)
+
+    def sorted_affiliations(self):
+        """
+        Get the affiliation indices in order of affiliation name.
+        """
+
+        return np.array(sorted(
+            range(len(self.affiliation_names)),
+            key=lambda x: self.affiliation_names[x]), dtype=np.intp)
+
+    def counts(self, accepted_only=False, student_only=False):
+        """
+        Compute the co-occurrence counts.
+
+        Returns an integer array of shape
+        (semester, PI affiliation, CoI affiliation).
+        """
+
+        n_semester = len(self.semesters)
+        n_affiliation = len(self.affiliation_names)
+
+        mask = np.ones(len(self._coi), dtype=bool)
+        if accepted_only:
+            mask &= np.array(self._accepted, dtype=bool)
+        if student_only:
+            mask &= np.array(self._student, dtype=bool)
+
+        flat = (
+            (np.array(self._semester, dtype=np.intp)[mask] * n_affiliation +
+             np.array(self._pi, dtype=np.intp)[mask]) * n_affiliation +
+            np.array(self._coi, dtype=np.intp)[mask])
+
+        return np.bincount(
+            flat, minlength=(n_semester * n_affiliation * n_affiliation)
+        ).reshape((n_semester, n_affiliation, n_affiliation))
+
+
+def normalize(counts, axis=-1):
+    """
+    Convert counts to fractions of the total along the given axis.
+
+    Where the total is zero, the fractions are also zero.
+    """
+
+    totals = counts.sum(axis=axis, keepdims=True)
+
+    return np.divide(
+        counts, totals,
+        out=np.zeros(counts.shape, dtype=float), where=(totals != 0))
@@ -0,0 +1,602 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Benchmarks for hedwig2omp using an in-memory stand-in for the
+Hedwig database.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+from datetime import datetime
+import io
+import json
+import os
+from random import Random
+import shutil
+import subprocess
+import tempfile
+from time import time
+
+from hedwig.astro.coord import CoordSystem
+from hedwig.compat import first_value
+import hedwig.facility.jcmt.type as jcmt_type
+from hedwig.facility.jcmt.type import \
+    JCMTInstrument, JCMTRequest, JCMTReviewerExpertise, JCMTWeather
+import hedwig.type.collection as collection
+from hedwig.type.enum import FormatType, \
+    ProposalState, ProposalType, ReviewState
+from hedwig.type.simple import \
+    Affiliation, Member, PrevProposal, Proposal, Reviewer, Target
+from hedwig.type.util import null_tuple
+from hedwig.util import get_logger
+
+from hedwig2omp.instrument import Profiler
+from hedwig2omp.type import Project
+
+logger = get_logger(__name__)
+
+benchmark_sizes = (100, 1000, 10000)
+
+benchmark_semester = '24A'
+
+benchmark_facility_id = 1
+
+
+def make_tuple(type_, **kwargs):
+    """
+    Make a namedtuple of the given type, setting only those of the given
+    values which correspond to fields of the type.
+    """
+
+    return null_tuple(type_)._replace(**{
+        k: v for (k, v) in kwargs.items() if k in type_._fields})
+
+
+def get_collection_class(module, name):
+    return getattr(module, name, collection.ResultCollection)
+
+
+class SyntheticData(object):
+    """
+    Generated proposals, with members, reviews, targets, requests,
+    allocations and previous proposals.
+
+    A fraction of the proposals are continuation requests, for which
+    the continued proposals (from the previous semester) are also
+    generated.
+    """
+
+    def __init__(self, n_proposal, facility, config, queue_code, seed=0):
+        random = Random(seed)
+
+        self.facility_id = benchmark_facility_id
+        self.call_id = 1
+        self.queue_id = 1
+        self.queue_code = queue_code
+        self.call_type = facility.get_call_types().STANDARD
+
+        role_class = facility.get_reviewer_roles()
+        roles = [
+            getattr(role_class, x) for x in (
+                'TECH', 'CTTEE_PRIMARY', 'CTTEE_SECONDARY', 'FEEDBACK')
+            if hasattr(role_class, x)]
+        expertise = list(JCMTReviewerExpertise.get_options().keys())
+
+        self.affiliations = OrderedDict()
+        for (i, code) in enumerate(config.affiliation_codes, 1):
+            self.affiliations[i] = make_tuple(
+                Affiliation, id=i, queue_id=self.queue_id,
+                name=config.get_affiliation_name(code),
+                hidden=False, exclude=False, weight=10.0)
+
+        n_person = 3 * n_proposal
+        self.users = {x: 'USER{}'.format(x) for x in range(1, n_person + 1)}
+
+        self.proposals = OrderedDict()
+        self.targets = OrderedDict()
+        self.requests = OrderedDict()
+        self.allocations = OrderedDict()
+        self.prev_proposals = OrderedDict()
+        self.jcmt_reviews = OrderedDict()
+
+        member_id = reviewer_id = target_id = request_id = prev_id = 0
+
+        for number in range(1, n_proposal + 1):
+            proposal_id = number
+            is_continuation = (random.random() < 0.05)
+
+            members = collection.MemberCollection()
+            for i in range(random.randint(1, 12)):
+                member_id += 1
+                affiliation = self.affiliations[
+                    random.randint(1, len(self.affiliations))]
+                person_id = random.randint(1, n_person)
+                members[member_id] = make_tuple(
+                    Member, id=member_id, proposal_id=proposal_id,
+                    sort_order=i, person_id=person_id,
+                    person_name='Person {}'.format(person_id),
+                    person_registered=True, pi=(i == 0),
+                    editor=(i == 0), observer=False,
+                    student=(random.random() < 0.2),
+                    affiliation_id=affiliation.id,
+                    affiliation_name=affiliation.name,
+                    institution_id=person_id,
+                    resolved_institution_id=person_id,
+                    institution_name='Institution {}'.format(person_id))
+
+            reviewers = collection.ReviewerCollection()
+            for role in roles:
+                reviewer_id += 1
+                reviewers[reviewer_id] = make_tuple(
+                    Reviewer, id=reviewer_id, proposal_id=proposal_id,
+                    role=role, person_id=random.randint(1, n_person),
+                    person_name='Reviewer', review_state=ReviewState.DONE,
+                    review_text=' '.join(
+                        ['Review text for proposal {}.'.format(number)] *
+                        random.randint(10, 100)),
+                    review_format=FormatType.PLAIN,
+                    review_rating=random.randint(0, 100),
+                    review_weight=random.randint(0, 100))
+                self.jcmt_reviews[reviewer_id] = make_tuple(
+                    jcmt_type.JCMTReview, reviewer_id=reviewer_id,
+                    expertise=random.choice(expertise))
+
+            self.proposals[proposal_id] = make_tuple(
+                Proposal, id=proposal_id, call_id=self.call_id,
+                facility_id=self.facility_id,
+                semester_code=benchmark_semester, queue_id=self.queue_id,
+                queue_code=queue_code, call_type=self.call_type,
+                number=number, state=ProposalState.ACCEPTED,
+                title='Synthetic proposal {}'.format(number),
+                type=(ProposalType.CONTINUATION if is_continuation
+                      else ProposalType.STANDARD),
+                members=members, reviewers=reviewers,
+                decision_accept=True, decision_exempt=False,
+                decision_note='Note for proposal {}'.format(number),
+                decision_note_format=FormatType.PLAIN)
+
+            for i in range(random.randint(1, 20)):
+                target_id += 1
+                self.targets[target_id] = make_tuple(
+                    Target, id=target_id, proposal_id=proposal_id,
+                    sort_order=i, name='Target {}'.format(target_id),
+                    x=random.uniform(0.0, 360.0),
+                    y=random.uniform(-30.0, 90.0),
+                    system=CoordSystem.ICRS, time=1.0, priority=None)
+
+            for collection_ in (self.requests, self.allocations):
+                for weather in (JCMTWeather.BAND1, JCMTWeather.BAND3):
+                    request_id += 1
+                    collection_[request_id] = make_tuple(
+                        JCMTRequest, id=request_id, proposal_id=proposal_id,
+                        instrument=JCMTInstrument.SCUBA2, ancillary=0,
+                        weather=weather, time=random.uniform(1.0, 20.0))
+
+            prev_id += 1
+            continued_id = n_proposal + number
+            self.prev_proposals[prev_id] = make_tuple(
+                PrevProposal, id=prev_id, this_proposal_id=proposal_id,
+                proposal_id=continued_id,
+                proposal_code='M23BP{:03d}'.format(number),
+                continuation=is_continuation, publications=[])
+
+            if is_continuation:
+                self.proposals[continued_id] = \
+                    self.proposals[proposal_id]._replace(
+                        id=continued_id, semester_code='23B',
+                        type=ProposalType.STANDARD)
+
+
+class FakeDatabase(object):
+    """
+    In-memory stand-in for the Hedwig database, based on `SyntheticData`.
+
+    This implements the search methods used by `make_proj_def`.  Other
+    `search_*` methods (e.g. used by the facility view) return empty
+    collections.  The number of calls made is recorded in `n_query`.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.n_query = 0
+
+    def __getattr__(self, name):
+        if not name.startswith('search_'):
+            raise AttributeError(name)
+
+        def search(*args, **kwargs):
+            logger.debug('Fake database has no method {}', name)
+            self.n_query += 1
+            return collection.ResultCollection()
+
+        return search
+
+    def ensure_facility(self, code):
+        return benchmark_facility_id
+
+    def _select(self, items, key, values, collection_class):
+        self.n_query += 1
+
+        if not isinstance(values, (list, tuple, set)):
+            values = (values,)
+        values = set(values)
+
+        return collection_class(
+            (k, v) for (k, v) in items.items()
+            if getattr(v, key) in values)
+
+    def search_proposal(
+            self, proposal_id=None, semester_code=None, queue_code=None,
+            call_type=None, state=None, with_members=False,
+            with_reviewers=False, with_review_text=False, **kwargs):
+        self.n_query += 1
+
+        if proposal_id is not None:
+            if not isinstance(proposal_id, (list, tuple, set)):
+                proposal_id = (proposal_id,)
+            proposal_id = set(proposal_id)
+
+        result = collection.ProposalCollection()
+        for proposal in self.data.proposals.values():
+            if ((proposal_id is not None) and
+                    (proposal.id not in proposal_id)):
+                continue
+            if ((semester_code is not None) and
+                    (proposal.semester_code != semester_code)):
+                continue
+            if ((queue_code is not None) and
+                    (proposal.queue_code != queue_code)):
+                continue
+            if state is not None:
+                if isinstance(state, (list, tuple, set)):
+                    if proposal.state not in state:
+                        continue
+                elif proposal.state != state:
+                    continue
+
+            if not with_members:
+                proposal = proposal._replace(members=None)
+
+            if not with_reviewers:
+                proposal = proposal._replace(reviewers=None)
+
+            else:
+                reviewers = collection.ReviewerCollection(
+                    proposal.reviewers.items())
+                if not with_review_text:
+                    for (id_, reviewer) in reviewers.items():
+                        reviewers[id_] = reviewer._replace(review_text=None)
+                proposal = proposal._replace(reviewers=reviewers)
+
+            if with_members:
+                # Copy the member collection since make_proj_def may
+                # remove members from it.
+                proposal = proposal._replace(
+                    members=collection.MemberCollection(
+                        proposal.members.items()))
+
+            result[proposal.id] = proposal
+
+        return result
+
+    def get_proposal(self, facility_id=None, proposal_id=None, **kwargs):
+        return self.search_proposal(
+            proposal_id=proposal_id, **kwargs).get_single()
+
+    def search_affiliation(self, queue_id=None, **kwargs):
+        return self._select(
+            self.data.affiliations, 'queue_id', queue_id,
+            get_collection_class(collection, 'AffiliationCollection'))
+
+    def search_jcmt_allocation(self, proposal_id):
+        return self._select(
+            self.data.allocations, 'proposal_id', proposal_id,
+            jcmt_type.JCMTRequestCollection)
+
+    def search_jcmt_request(self, proposal_id):
+        return self._select(
+            self.data.requests, 'proposal_id', proposal_id,
+            jcmt_type.JCMTRequestCollection)
+
+    def search_jcmt_options(self, proposal_id):
+        return self._select(
+            OrderedDict(), 'proposal_id', proposal_id,
+            get_collection_class(jcmt_type, 'JCMTOptionsCollection'))
+
+    def search_jcmt_alloc_options(self, proposal_id):
+        return self.search_jcmt_options(proposal_id)
+
+    def search_jcmt_review(self, reviewer_id):
+        return self._select(
+            self.data.jcmt_reviews, 'reviewer_id', reviewer_id,
+            collection.ResultCollection)
+
+    def search_target(self, proposal_id):
+        return self._select(
+            self.data.targets, 'proposal_id', proposal_id,
+            collection.TargetCollection)
+
+    def search_prev_proposal(
+            self, proposal_id, continuation=None, **kwargs):
+        result = self._select(
+            self.data.prev_proposals, 'this_proposal_id', proposal_id,
+            collection.PrevProposalCollection)
+
+        if continuation is not None:
+            for (id_, prev_proposal) in list(result.items()):
+                if prev_proposal.continuation != continuation:
+                    del result[id_]
+
+        return result
+
+
+def get_version():
+    """
+    Attempt to determine the version of hedwig2omp being benchmarked.
+    """
+
+    try:
+        return subprocess.check_output(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.STDOUT).decode('ascii').strip()
+    except Exception:
+        return 'unknown'
+
+
+def make_args(output_dir, **kwargs):
+    """
+    Prepare `make_proj_def` arguments writing all of the outputs
+    to the given directory.
+    """
+
+    args = {
+        '--facility': 'JCMT',
+        '--semester': benchmark_semester,
+        '--queue': None,
+        '--type': 'NONE',
+        '--project': [],
+        '--state': 'accepted',
+        '--decision-accept': False,
+        '--include-exempt-affiliations': False,
+        '--skip-unknown-cois': False,
+        '--skip-unknown-pis': False,
+        '--all-reviews': False,
+        '--dummy-allocation': False,
+        '--request-allocation': False,
+        '--chunk-size': None,
+        '--prefetch-threads': None,
+        '--incremental': None,
+        '--change-report': None,
+        '--diff-against': None,
+        '--output-changed': None,
+        '--json-format': 'indent',
+        '--target-tolerance': '5',
+    }
+
+    for (option, filename) in (
+            ('--output', 'project.ini'),
+            ('--output-continuation', 'continuation.ini'),
+            ('--output-affiliations', 'affiliations.txt'),
+            ('--output-targets', 'targets.json'),
+            ('--output-targets-icrs', 'targets_icrs.json'),
+            ('--output-overlap', 'overlap.csv'),
+            ('--output-notes', 'notes.txt'),
+            ('--output-feedback', 'feedback.txt'),
+            ('--output-publications', 'publications.csv'),
+            ('--output-json', 'proposals.json'),
+            ('--output-columnar', 'columnar')):
+        args[option] = os.path.join(output_dir, filename)
+
+    args.update(kwargs)
+
+    return args
+
+
+def time_call(function, *args, **kwargs):
+    time_start = time()
+    function(*args, **kwargs)
+    return time() - time_start
+
+
+def benchmark_writers(data):
+    """
+    Time each of the output writers separately, using inputs
+    prepared from the synthetic data.
+    """
+
+    from hedwig2omp.notes_file import write_notes_file
+    from hedwig2omp.prev_prop_pub import write_prev_prop_pub
+    from hedwig2omp.proj_def import TextFormat
+    from hedwig2omp.project_ini import write_project_ini
+    from hedwig2omp.project_list_json import write_json_file
+    from hedwig2omp.target_file import write_target_file
+    from hedwig2omp.target_overlap import TargetTable
+
+    proposals = data.proposals
+    codes = OrderedDict(
+        (x.id, 'M{}{}{:03d}'.format(x.semester_code, x.queue_code, x.number))
+        for x in proposals.values())
+
+    projects = [
+        null_tuple(Project)._replace(
+            code=codes[x.id], country='XX', pi='USER1',
+            pi_affiliation='zz',
+            cois=['USER{}'.format(y.person_id) for y in x.members.values()],
+            coi_affiliation=['zz' for y in x.members.values()],
+            title=x.title, bands=[1, 3], allocation=10.0, tagpriority=100,
+            support='', expiry=None)
+        for x in proposals.values()]
+
+    targets = collection.TargetCollection(data.targets.items())
+    prev_proposals = collection.PrevProposalCollection(
+        data.prev_proposals.items())
+
+    notes = OrderedDict(
+        (codes[x.id], {
+            'note': TextFormat(
+                text=x.decision_note, format=x.decision_note_format),
+            'continuation': None})
+        for x in proposals.values())
+
+    proposal_details = OrderedDict(
+        (codes[x.id], dict(
+            x._replace(members=None, reviewers=None)._asdict(),
+            targets=targets.subset_by_proposal(x.id)))
+        for x in proposals.values())
+
+    results = OrderedDict()
+
+    results['write_project_ini'] = time_call(
+        write_project_ini, io.StringIO(), 'JCMT', benchmark_semester,
+        projects)
+
+    results['write_json_file'] = time_call(
+        write_json_file, io.StringIO(), proposal_details)
+
+    proposal_targets = OrderedDict(
+        (codes[x.id], targets.subset_by_proposal(x.id))
+        for x in proposals.values())
+
+    results['write_target_file'] = time_call(
+        write_target_file, io.StringIO(), proposal_targets)
+
+    results['target_overlap'] = time_call(
+        TargetTable, proposal_targets, 5.0)
+
+    results['write_notes_file'] = time_call(
+        write_notes_file, io.StringIO(), notes)
+
+    results['write_prev_prop_pub'] = time_call(
+        write_prev_prop_pub, io.StringIO(), OrderedDict(
+            (codes[x.id], prev_proposals.subset_by_this_proposal(x.id))
+            for x in proposals.values()))
+
+    return results
+
+
+def run_benchmark(config, sizes=benchmark_sizes, seed=0, **kwargs):
+    """
+    Run the benchmarks for each of the given numbers of proposals.
+
+    Additional keyword arguments are used as `make_proj_def` arguments.
+
+    Returns a dictionary of results.
+    """
+
+    from hedwig.config import get_facilities
+
+    from hedwig2omp.proj_def import export_proj_def
+
+    results = OrderedDict((
+        ('version', get_version()),
+        ('date', datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')),
+        ('sizes', OrderedDict()),
+    ))
+
+    queue_codes = config.get_queue_codes()
+    queue_code = queue_codes[0].upper() if queue_codes else 'P'
+
+    for n_proposal in sizes:
+        logger.info('Benchmarking with {} proposals', n_proposal)
+
+        # Prepare the facility using a database with no data.
+        db = FakeDatabase(None)
+        facility_info = first_value(get_facilities(
+            db=db, facility_spec='JCMT'))
+
+        time_start = time()
+        data = SyntheticData(
+            n_proposal, facility_info.view, config, queue_code, seed=seed)
+        db = FakeDatabase(data)
+        time_generate = time() - time_start
+
+        output_dir = tempfile.mkdtemp(prefix='hedwig2omp_benchmark')
+        try:
+            args = make_args(output_dir, **kwargs)
+            args['--queue'] = queue_code
+
+            profiler = Profiler()
+            with profiler.phase('total'):
+                export_proj_def(
+                    args, profiler.wrap(db, 'db'), facility_info,
+                    data.users, config, profiler)
+
+            report = profiler.get_report()
+
+        finally:
+            shutil.rmtree(output_dir)
+
+        results['sizes'][str(n_proposal)] = OrderedDict((
+            ('generate', time_generate),
+            ('make_proj_def', OrderedDict(
+                (x['name'], x['time']) for x in report['phases'])),
+            ('queries', db.n_query),
+            ('writers', benchmark_writers(data)),
+        ))
+
+    return results
+
+
+def flatten_results(results):
+    """
+    Convert the results for each size into a flat dictionary of timings.
+    """
+
+    flat = OrderedDict()
+
+    for (size, size_results) in results['sizes'].items():
+        for section in ('make_proj_def', 'writers'):
+            for (name, value) in size_results[section].items():
+                flat[(size, section, name)] = value
+
+    return flat
+
+
+def store_results(filename, results):
+    """
+    Append results to a file in JSON Lines format.
+    """
+
+    with open(filename, 'a') as file_:
+        file_.write(json.dumps(results))
+        file_.write('\n')
+
+
+def read_results(filename, version=None):
+    """
+    Read the most recent results for the given version (or any version)
+    from a results file.
+    """
+
+    found = None
+
+    with open(filename, 'r') as file_:
+        for line in file_:
+            if not line.strip():
+                continue
+
+            results = json.loads(line, object_pairs_hook=OrderedDict)
+
+            if (version is None) or (results['version'] == version):
+                found = results
+
+    return found
+
@@ -0,0 +1,99 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Client for the export server (see `hedwig2omp.server`).
+
+This module only uses the standard library, so that the client starts
+quickly.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from contextlib import closing
+import json
+import os
+import socket
+import sys
+
+from hedwig2omp.config import get_config, get_path
+
+default_socket = 'var/hedwig2omp.sock'
+
+
+def get_socket_path():
+    """
+    Get the server socket path from the configuration file.
+    """
+
+    config = get_config()
+
+    if config.has_option('server', 'socket'):
+        return get_path(config.get('server', 'socket'))
+
+    return get_path(default_socket)
+
+
+def send_request(socket_path, request):
+    """
+    Send a request to the server and iterate over the response frames.
+    """
+
+    with closing(socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+        with closing(sock.makefile('rb')) as f:
+            for line in f:
+                yield json.loads(line.decode('utf-8'))
+
+
+def run_remote(socket_path, request):
+    """
+    Send a request, copying output to standard output and error.
+
+    Returns the exit status.
+    """
+
+    status = 1
+
+    for frame in send_request(socket_path, request):
+        if 'stdout' in frame:
+            sys.stdout.write(frame['stdout'])
+            sys.stdout.flush()
+
+        elif 'stderr' in frame:
+            sys.stderr.write(frame['stderr'])
+            sys.stderr.flush()
+
+        elif 'exit' in frame:
+            status = frame['exit']
+
+    return status
+
+
+def run_remote_command(socket_path, name, argv):
+    """
+    Run a command on the server, in the current directory.
+    """
+
+    return run_remote(socket_path, {
+        'command': name,
+        'argv': argv,
+        'cwd': os.getcwd(),
+    })
@@ -0,0 +1,317 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Columnar export of the proposal list.
+
+The proposal details (as written by `write_json_file`) are flattened into
+the tables listed in `column_tables`, each of which is written as a NumPy
+`.npz` file containing one array per column.  Individual columns can then
+be loaded without reading the rest of the file, for example::
+
+    with np.load('members.npz') as members:
+        affiliation = members['affiliation_name']
+        names = members['affiliation_name_names']
+
+Column types:
+
+`str`
+    Unicode string array, with missing values as empty strings.
+
+`int`
+    Integer array, with missing values as -1.
+
+`float`
+    Floating point array, with missing values as NaN.
+
+`bool`
+    Integer (int8) array of 1 (true), 0 (false) or -1 (missing).
+
+`enum`
+    Integer (int16) codes, with missing values as -1.  The values
+    corresponding to the codes are given by an additional string array
+    named with the suffix `_names`.
+
+All tables other than `proposals` have a `proposal` column giving the
+index of the proposal in the `proposals` table, which is sorted by
+proposal code.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+import os
+
+import numpy as np
+
+from hedwig2omp.project_list_json import filter_object
+
+# Column definitions for each table: name, type and path (sequence of keys)
+# within the row dictionary.
+column_tables = OrderedDict((
+    ('proposals', (
+        ('code', 'str', ('proposal_code',)),
+        ('semester_code', 'enum', ('semester_code',)),
+        ('queue_code', 'enum', ('queue_code',)),
+        ('call_type', 'enum', ('call_type',)),
+        ('number', 'int', ('number',)),
+        ('state', 'enum', ('state',)),
+        ('type', 'enum', ('type',)),
+        ('title', 'str', ('title',)),
+        ('decision_accept', 'bool', ('decision_accept',)),
+        ('decision_exempt', 'bool', ('decision_exempt',)),
+        ('rating', 'float', ('rating',)),
+        ('rating_std_dev', 'float', ('rating_std_dev',)),
+        ('omp_priority', 'float', ('omp_priority',)),
+        ('omp_pi', 'str', ('omp_pi',)),
+    )),
+    ('members', (
+        ('pi', 'bool', ('pi',)),
+        ('person_id', 'int', ('person_id',)),
+        ('person_name', 'str', ('person_name',)),
+        ('student', 'bool', ('student',)),
+        ('affiliation_name', 'enum', ('affiliation_name',)),
+        ('institution_name', 'str', ('institution_name',)),
+        ('institution_country', 'enum', ('institution_country',)),
+    )),
+    ('affiliations', (
+        ('affiliation_name', 'enum', ('affiliation_name',)),
+        ('fraction', 'float', ('fraction',)),
+    )),
+    ('requests', (
+        ('instrument', 'enum', ('instrument',)),
+        ('ancillary', 'enum', ('ancillary',)),
+        ('weather', 'enum', ('weather',)),
+        ('time', 'float', ('time',)),
+    )),
+    ('allocations', (
+        ('instrument', 'enum', ('instrument',)),
+        ('ancillary', 'enum', ('ancillary',)),
+        ('weather', 'enum', ('weather',)),
+        ('time', 'float', ('time',)),
+    )),
+    ('targets', (
+        ('name', 'str', ('name',)),
+        ('x', 'float', ('x',)),
+        ('y', 'float', ('y',)),
+        ('system', 'enum', ('system',)),
+        ('time', 'float', ('time',)),
+        ('priority', 'int', ('priority',)),
+    )),
+    ('reviews', (
+        ('role', 'enum', ('role',)),
+        ('person_id', 'int', ('person_id',)),
+        ('review_state', 'enum', ('review_state',)),
+        ('review_assessment', 'enum', ('review_assessment',)),
+        ('review_rating', 'int', ('review_rating',)),
+        ('review_weight', 'float', ('review_weight',)),
+        ('expertise', 'enum', ('review_extra', 'expertise')),
+    )),
+))
+
+column_missing = {
+    'str': '',
+    'int': -1,
+    'float': np.nan,
+    'bool': -1,
+    'enum': None,
+}
+
+
+def get_value(row, path):
+    for key in path:
+        if not isinstance(row, dict):
+            return None
+
+        row = row.get(key)
+
+    return row
+
+
+def iter_table_rows(code, obj_):
+    """
+    Iterate over the rows derived from a (filtered) proposal detail
+    dictionary.
+
+    Yields tuples of table name and row dictionary.
+    """
+
+    yield ('proposals', dict(obj_, proposal_code=code))
+
+    if obj_.get('member_pi') is not None:
+        yield ('members', obj_['member_pi'])
+
+    for member in obj_.get('member_cois') or ():
+        yield ('members', member)
+
+    for (name, fraction) in sorted(
+            (obj_.get('affiliation_assignment') or {}).items()):
+        yield ('affiliations', {
+            'affiliation_name': name, 'fraction': fraction})
+
+    for (table, key) in (
+            ('requests', 'request'),
+            ('allocations', 'allocation'),
+            ('targets', 'targets')):
+        for row in obj_.get(key) or ():
+            yield (table, row)
+
+    for (key, value) in sorted(obj_.items()):
+        if not key.startswith('review_'):
+            continue
+
+        if isinstance(value, dict):
+            yield ('reviews', value)
+
+        elif isinstance(value, list):
+            for review in value:
+                yield ('reviews', review)
+
+
+class ColumnarTables(object):
+    """
+    Store of flattened proposal details, for columnar output.
+
+    The rows for each proposal are kept as tuples of simple values
+    so that the proposal objects can be released as they are processed,
+    in the same way as for `JSONFragmentSpool`.
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def add(self, code, proposal_detail):
+        """
+        Flatten and store the details of a proposal.
+
+        Returns the rows, which can be stored and given again to
+        `add_rows` in a later export.
+        """
+
+        rows = OrderedDict((x, []) for x in column_tables.keys())
+
+        for (table, row) in iter_table_rows(
+                code, filter_object(proposal_detail)):
+            rows[table].append(tuple(
+                get_value(row, path) for (name, type_, path)
+                in column_tables[table]))
+
+        self.add_rows(code, rows)
+
+        return rows
+
+    def add_rows(self, code, rows):
+        self.rows[code] = rows
+
+    def get_arrays(self):
+        """
+        Construct the column arrays.
+
+        Returns a dictionary, by table name, of dictionaries of arrays.
+        """
+
+        codes = sorted(self.rows.keys())
+
+        arrays = OrderedDict()
+
+        for (table, columns) in column_tables.items():
+            proposal_index = []
+            values = []
+
+            for (i, code) in enumerate(codes):
+                table_rows = self.rows[code][table]
+                proposal_index.extend([i] * len(table_rows))
+                values.extend(table_rows)
+
+            table_arrays = arrays[table] = OrderedDict()
+
+            if table != 'proposals':
+                table_arrays['proposal'] = np.array(
+                    proposal_index, dtype=np.int32)
+
+            for (j, (name, type_, path)) in enumerate(columns):
+                column = [x[j] for x in values]
+
+                if type_ == 'enum':
+                    (codes_, names) = encode_enum(column)
+                    table_arrays[name] = codes_
+                    table_arrays[name + '_names'] = names
+
+                else:
+                    table_arrays[name] = make_column(column, type_)
+
+        return arrays
+
+
+def encode_enum(values):
+    """
+    Encode a list of values as integer codes, in order of first appearance.
+
+    Returns a tuple of the array of codes and the array of names.
+    """
+
+    index = {}
+    codes = np.empty(len(values), dtype=np.int16)
+
+    for (i, value) in enumerate(values):
+        if value is None:
+            codes[i] = -1
+            continue
+
+        value = '{}'.format(value)
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(index)
+        codes[i] = code
+
+    names = sorted(index.keys(), key=lambda x: index[x])
+
+    return (codes, np.array(names, dtype=np.str_))
+
+
+def make_column(values, type_):
+    missing = column_missing[type_]
+    values = [missing if x is None else x for x in values]
+
+    if type_ == 'str':
+        return np.array(
+            ['{}'.format(x) for x in values], dtype=np.str_)
+
+    elif type_ == 'int':
+        return np.array(values, dtype=np.int64)
+
+    elif type_ == 'float':
+        return np.array(values, dtype=np.float64)
+
+    elif type_ == 'bool':
+        return np.array(
+            [x if x == -1 else int(bool(x)) for x in values], dtype=np.int8)
+
+    raise Exception('Unknown column type: {}'.format(type_))
+
+
+def write_column_table(file_, table_arrays):
+    """
+    Write the arrays for a table to an (uncompressed) `.npz` file.
+    """
+
+    np.savez(file_, **table_arrays)
+
+
+def get_table_filename(directory, table):
+    return os.path.join(directory, '{}.npz'.format(table))
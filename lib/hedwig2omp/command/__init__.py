@@ -0,0 +1,93 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Commands which can be run by their scripts or via the `hedwig2omp`
+entry point.
+
+Each command module has a docopt usage docstring and a `main` function,
+taking an optional list of arguments.  Modules should import only light
+modules at the top level, with database access and writer modules being
+imported once the arguments have been parsed, so that the `hedwig2omp`
+entry point starts quickly.
+
+The `server_commands` can also be run by the server
+(see `hedwig2omp.server`).  These have a `run(args, session)` function
+taking the parsed arguments and a `Session`.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from importlib import import_module
+import logging
+
+commands = (
+    'add_user',
+    'affiliation_allocation',
+    'affiliation_stats',
+    'affiliation_x_match',
+    'export_pdf',
+    'make_proj_def',
+    'match_users',
+)
+
+server_commands = (
+    'affiliation_allocation',
+    'affiliation_stats',
+    'make_proj_def',
+)
+
+
+def get_command(name):
+    """
+    Import the module for the named command.
+    """
+
+    if name not in commands:
+        raise ValueError('Unknown command "{}"'.format(name))
+
+    return import_module('hedwig2omp.command.{}'.format(name))
+
+
+def get_multiprocessing_context():
+    """
+    Get a multiprocessing context for starting worker processes.
+
+    The "spawn" method is used, where available, so that the workers
+    do not inherit the database connections of the parent process.
+    """
+
+    import multiprocessing
+
+    try:
+        return multiprocessing.get_context('spawn')
+
+    except AttributeError:
+        # Python 2: only the "fork" method is available.
+        return multiprocessing
+
+
+def get_log_level(args):
+    """
+    Determine the logging level from the `--verbose` and `--quiet`
+    command line options.
+    """
+
+    return (logging.DEBUG if args['--verbose']
+            else (logging.WARNING if args['--quiet']
+                  else logging.INFO))
@@ -0,0 +1,142 @@
+# Copyright (C) 2020 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+add_user - Add a specific user to the hedwig2omp user database
+
+Usage:
+    add_user [-v | -q] <hedwig_id> <omp_id>
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    add_user [-v | -q] --file <filename>
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+
+    --file <filename>             CSV file of hedwig_id,omp_id pairs ("-" for stdin)
+    --verbose, -v                 Increase verbosity
+    --quiet, -q                   Decreate verbosity
+    --profile                     Report time and queries for each phase
+    --profile-output <filename>   Write the profile report in JSON format
+    --profile-dump <filename>     Write cProfile statistics for main phase
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import csv
+import logging
+import sys
+
+from docopt import docopt
+
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level
+from hedwig2omp.instrument import Profiler
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+
+    logger = get_logger('add_user')
+
+    from hedwig2omp.user import UserDB
+
+    profiler = Profiler.from_args(args)
+
+    user_db = profiler.wrap(UserDB(), 'UserDB')
+
+    if args['--file'] is None:
+        with profiler.phase('process'):
+            user_db.add_user(int(args['<hedwig_id>']), args['<omp_id>'])
+
+        profiler.report()
+        return
+
+    if args['--file'] == '-':
+        pairs = read_pairs(sys.stdin, 'standard input')
+    else:
+        with open(args['--file'], 'r') as file_:
+            pairs = read_pairs(file_, args['--file'])
+
+    logger.debug('Adding {} user(s)', len(pairs))
+    with profiler.phase('process'):
+        (added, skipped, conflicts) = user_db.add_users(pairs)
+
+    for (hedwig_id, omp_id, existing) in conflicts:
+        if existing is None:
+            logger.error('Conflicting entry for Hedwig user {}: {}'
+                         ' (other OMP IDs given)', hedwig_id, omp_id)
+        else:
+            logger.error('Conflicting entry for Hedwig user {}: {}'
+                         ' (existing: {})', hedwig_id, omp_id, existing)
+
+    logger.info('Added {} user(s), skipped {} existing, {} conflict(s)',
+                len(added), len(skipped), len(conflicts))
+
+    profiler.report()
+
+    if conflicts:
+        sys.exit(1)
+
+
+def read_pairs(file_, filename):
+    """
+    Read (hedwig_id, omp_id) pairs from a CSV file.
+
+    Blank lines, comments (starting "#") and a "hedwig_id" header line
+    are ignored.  Exits with an error if any other line is not valid.
+    """
+
+    logger = get_logger('add_user')
+
+    pairs = []
+    reader = csv.reader(file_)
+
+    for row in reader:
+        if (not row) or (not row[0].strip()) or row[0].startswith('#'):
+            continue
+
+        if row[0].strip() == 'hedwig_id':
+            continue
+
+        if len(row) != 2:
+            logger.error('{} line {}: expected 2 fields, found {}',
+                         filename, reader.line_num, len(row))
+            sys.exit(1)
+
+        (hedwig_id, omp_id) = row
+
+        try:
+            hedwig_id = int(hedwig_id)
+        except ValueError:
+            logger.error('{} line {}: Hedwig ID "{}" is not an integer',
+                         filename, reader.line_num, hedwig_id)
+            sys.exit(1)
+
+        omp_id = omp_id.strip()
+        if not omp_id:
+            logger.error('{} line {}: OMP ID is missing',
+                         filename, reader.line_num)
+            sys.exit(1)
+
+        pairs.append((hedwig_id, omp_id))
+
+    return pairs
+
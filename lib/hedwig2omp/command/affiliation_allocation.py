@@ -0,0 +1,218 @@
+# Copyright (C) 2017-2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+affiliation_allocation - Export affiliation allocations from Hedwig database
+
+Usage:
+    affiliation-allocation [-v | -q] --semester <semester> --queue <queue> --type <type>
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    affiliation-allocation [-v | -q] --semester <semester> [--type <type>]
+        [--by-call]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+
+    --semester <semester>             Semester code
+    --queue <queue>                   Queue code
+    --type <type>                     Call type code
+    --by-call                         Write separate allocations for each call
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+
+If no queue is specified, allocations are exported for all of the calls
+in the semester (of the given type, if specified).  The allocations for
+each affiliation are combined unless the --by-call option is given,
+in which case the queue and type codes are included in each line.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict, defaultdict
+import logging
+import sys
+
+from docopt import docopt
+
+from hedwig.compat import str_to_unicode
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level
+from hedwig2omp.instrument import Profiler
+
+logger = get_logger('affiliation_allocation')
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+
+    from hedwig2omp.session import Session
+
+    run(args, Session())
+
+
+def run(args, session):
+    from hedwig.error import NoSuchValue
+
+    telescope = 'JCMT'
+
+    profiler = Profiler.from_args(args)
+    profiler.start_phase('setup')
+
+    logger.debug('Reading configuration')
+    config = session.config
+
+    db = profiler.wrap(session.db, 'db')
+    facility_info = session.get_facility(telescope)
+    facility = facility_info.view
+
+    profiler.end_phase()
+
+    call_type = None
+    if args['--type'] is not None:
+        try:
+            call_type = facility.get_call_types().by_code(args['--type'])
+        except NoSuchValue:
+            logger.error('Type "{}" not recognised', args['--type'])
+            sys.exit(1)
+
+    semester_code = str_to_unicode(args['--semester'])
+
+    if args['--queue'] is None:
+        with profiler.phase('process'):
+            export_semester(
+                args, db, config, facility, facility_info.id,
+                semester_code, call_type)
+
+        profiler.report()
+        return
+
+    queue_code = str_to_unicode(args['--queue'])
+
+    profiler.start_phase('process')
+
+    logger.debug('Finding call')
+    call = db.search_call(
+        facility_id=facility_info.id, type_=call_type,
+        queue_code=queue_code, semester_code=semester_code).get_single()
+
+    # Replicate logic from hedwig.facility.jcmt.view._get_proposal_tabulation.
+    logger.debug('Getting time available')
+    available = db.search_jcmt_available(
+        call_id=call.id).get_total().total_non_free
+
+    logger.debug('Getting affiliations')
+    affiliations = db.search_affiliation(
+        queue_id=call.queue_id, hidden=False, with_weight_call_id=call.id)
+
+    for affiliation in affiliations.values():
+        if affiliation.weight is not None:
+            affiliation_code = config.get_affiliation_code(affiliation.name)
+            if affiliation_code is None:
+                logger.error('Unknown affiliation "{}"', affiliation.name)
+                sys.exit(1)
+
+            print('{},{},{}'.format(
+                args['--semester'],
+                affiliation_code,
+                (available * affiliation.weight / 100.0)))
+
+    profiler.end_phase()
+    profiler.report()
+
+
+def export_semester(
+        args, db, config, facility, facility_id, semester_code, call_type):
+    """
+    Export the affiliation allocations for all calls in a semester.
+
+    The time available and affiliation weights are fetched for all of the
+    calls together, and the affiliations once for each queue.
+    """
+
+    logger.debug('Finding calls')
+    calls = db.search_call(
+        facility_id=facility_id, type_=call_type,
+        semester_code=semester_code)
+
+    if not calls:
+        logger.error('No calls found for semester {}', semester_code)
+        sys.exit(1)
+
+    call_ids = list(calls.keys())
+
+    # Replicate logic from hedwig.facility.jcmt.view._get_proposal_tabulation,
+    # dividing the collection by call so that totals can be computed.
+    logger.debug('Getting time available for {} call(s)', len(call_ids))
+    available_all = db.search_jcmt_available(call_id=call_ids)
+    available = defaultdict(type(available_all))
+    for (id_, row) in available_all.items():
+        available[row.call_id][id_] = row
+
+    logger.debug('Getting affiliation weights')
+    weights = {}
+    for weight in db.search_affiliation_weight(call_id=call_ids).values():
+        weights[(weight.call_id, weight.affiliation_id)] = weight.weight
+
+    queue_affiliations = {}
+    type_class = facility.get_call_types()
+
+    allocations = OrderedDict()
+
+    for call in sorted(
+            calls.values(), key=lambda x: (x.queue_code, x.type)):
+        type_code = type_class.get_code(call.type)
+
+        call_available = available[call.id].get_total().total_non_free
+
+        affiliations = queue_affiliations.get(call.queue_id)
+        if affiliations is None:
+            logger.debug('Getting affiliations for queue {}', call.queue_code)
+            affiliations = queue_affiliations[call.queue_id] = \
+                db.search_affiliation(queue_id=call.queue_id, hidden=False)
+
+        for affiliation in affiliations.values():
+            weight = weights.get((call.id, affiliation.id))
+            if weight is None:
+                continue
+
+            affiliation_code = config.get_affiliation_code(affiliation.name)
+            if affiliation_code is None:
+                logger.error('Unknown affiliation "{}"', affiliation.name)
+                sys.exit(1)
+
+            key = affiliation_code
+            if args['--by-call']:
+                key = (call.queue_code, type_code, affiliation_code)
+
+            allocations[key] = allocations.get(key, 0.0) + (
+                call_available * weight / 100.0)
+
+    for (key, allocation) in allocations.items():
+        if args['--by-call']:
+            print('{},{},{},{},{}'.format(
+                args['--semester'], key[0], key[1], key[2], allocation))
+
+        else:
+            print('{},{},{}'.format(args['--semester'], key, allocation))
+
@@ -0,0 +1,332 @@
+# Copyright (C) 2015-2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+affiliation_stats - Export affiliation statisticcs from Hedwig database
+
+Usage:
+    affiliation_stats [-v | -q] --semester <semester> --queue <queue> --affiliation <affiliation>
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    affiliation_stats [-v | -q] --semester <semester> --queue <queue> --all-affiliations
+        [--output-dir <directory>]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+
+    --semester <semester>             Semester code
+    --queue <queue>                   Queue code
+    --affiliation <affiliation>       Affiliation code
+    --all-affiliations                Export statistics for every affiliation
+    --output-dir <directory>          Write one CSV file per affiliation
+                                      (otherwise a combined file is written)
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict, defaultdict
+import logging
+import os
+import sys
+
+from docopt import docopt
+
+from hedwig.compat import str_to_unicode
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level
+from hedwig2omp.instrument import Profiler
+
+logger = get_logger('affiliation_stats')
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+
+    from hedwig2omp.session import Session
+
+    run(args, Session())
+
+
+def run(args, session):
+    from hedwig.type.enum import ProposalState
+
+    telescope = 'JCMT'
+    semester_code = str_to_unicode(args['--semester'])
+    queue_code = str_to_unicode(args['--queue'])
+
+    profiler = Profiler.from_args(args)
+    profiler.start_phase('setup')
+
+    logger.debug('Reading configuration')
+    config = session.config
+
+    db = profiler.wrap(session.db, 'db')
+    facility_info = session.get_facility(telescope)
+    facility = facility_info.view
+
+    logger.debug('Looking up queue ID')
+    for queue in db.search_queue(facility_id=facility_info.id).values():
+        if queue.code == queue_code:
+            queue_id = queue.id
+            break
+    else:
+        logger.error('Could not find queue code "{}"', queue_code)
+        sys.exit(1)
+
+    logger.debug('Looking up affiliation ID')
+    affiliations = OrderedDict()
+    for affiliation in db.search_affiliation(queue_id=queue_id).values():
+        affiliations[affiliation.id] = affiliation.name
+
+    # Determine the affiliations (by ID) for which to export statistics,
+    # with the code to use for each.
+    selected = OrderedDict()
+    if args['--all-affiliations']:
+        for (affiliation_id, affiliation_name) in affiliations.items():
+            selected[affiliation_id] = config.get_affiliation_code(
+                affiliation_name, affiliation_name)
+
+    else:
+        affiliation_code = str_to_unicode(args['--affiliation'])
+
+        affiliation_name = config.get_affiliation_name(
+            affiliation_code, affiliation_code)
+
+        for (affiliation_id, name) in affiliations.items():
+            if name == affiliation_name:
+                selected[affiliation_id] = affiliation_code
+                break
+        else:
+            logger.error('Could not find affiliation name "{}"', affiliation_name)
+            sys.exit(1)
+
+    profiler.end_phase()
+    profiler.start_phase('select')
+
+    logger.debug('Finding proposals for this call')
+    proposal_collection = db.search_proposal(
+        facility_id=facility_info.id,
+        semester_code=semester_code,
+        queue_code=queue_code,
+        state=(ProposalState.REVIEW,
+               ProposalState.ACCEPTED,
+               ProposalState.REJECTED),
+        with_members=True,
+        with_decision=True)
+
+    logger.debug('Fetching requests and allocations')
+    proposal_ids = [x.id for x in proposal_collection.values()]
+    all_requests = db.search_jcmt_request(proposal_id=proposal_ids)
+    all_allocations = db.search_jcmt_allocation(proposal_id=proposal_ids)
+
+    profiler.end_phase()
+    profiler.start_phase('process')
+
+    # Institutions (for each affiliation) and proposal statistics
+    # (for each affiliation).
+    institutions = defaultdict(OrderedDict)
+    proposals = defaultdict(list)
+
+    for proposal in proposal_collection.values():
+        code = facility.make_proposal_code(db, proposal)
+
+        # Process member list, counting members by affiliation
+        # and by institution within each affiliation.
+        pi = None
+        cois = defaultdict(list)
+        n_coi = 0
+        n_affil = defaultdict(int)
+        n_inst = defaultdict(lambda: defaultdict(int))
+
+        for member in proposal.members.values():
+            affiliation_id = member.affiliation_id
+            institution_id = member.resolved_institution_id
+
+            n_affil[affiliation_id] += 1
+            n_inst[affiliation_id][institution_id] += 1
+            if institution_id not in institutions[affiliation_id]:
+                institutions[affiliation_id][institution_id] = \
+                    member.institution_name
+
+            if member.pi and (pi is None):
+                pi = member
+            else:
+                n_coi += 1
+                cois[affiliation_id].append(member)
+
+        relevant = [
+            x for x in selected
+            if ((pi is not None) and (pi.affiliation_id == x)) or cois[x]]
+
+        if not relevant:
+            continue
+
+        logger.debug('Processing project {}', code)
+
+        accepted = ((proposal.state == ProposalState.ACCEPTED) or
+                    ((proposal.state == ProposalState.REVIEW) and
+                     proposal.decision_accept))
+
+        request = all_requests.subset_by_proposal(proposal.id)
+        allocation = all_allocations.subset_by_proposal(proposal.id)
+        if accepted and not allocation:
+            logger.error('No allocation for accepted project {}', code)
+            sys.exit(1)
+
+        if request:
+            request = request.get_total()
+        else:
+            request = None
+        if allocation and accepted:
+            allocation = allocation.get_total()
+        else:
+            allocation = None
+
+        for affiliation_id in relevant:
+            affiliation_pi = (
+                pi if ((pi is not None) and
+                       (pi.affiliation_id == affiliation_id)) else None)
+            affiliation_cois = cois[affiliation_id]
+
+            proposals[affiliation_id].append({
+                'code': code,
+                'pi': (affiliation_pi is not None),
+                'cois': len(affiliation_cois),
+                'n_coi': n_coi,
+                'accepted': accepted,
+                'request': (request.total if request is not None else None),
+                'allocation': (allocation.total if allocation is not None else None),
+                'n_affil': {
+                    k: v for (k, v) in n_affil.items()
+                    if k != affiliation_id},
+                'n_inst': n_inst[affiliation_id],
+                'pi_student': (affiliation_pi.student
+                               if affiliation_pi is not None else None),
+                'coi_students': sum([1 for x in affiliation_cois if x.student]),
+            })
+
+    profiler.end_phase()
+    profiler.start_phase('write')
+
+    if not args['--all-affiliations']:
+        for affiliation_id in selected:
+            print(make_csv(
+                proposals[affiliation_id],
+                institutions[affiliation_id],
+                OrderedDict(
+                    (k, v) for (k, v) in affiliations.items()
+                    if k != affiliation_id)))
+
+    elif args['--output-dir'] is not None:
+        for (affiliation_id, affiliation_code) in selected.items():
+            filename = os.path.join(
+                args['--output-dir'], '{}_{}_{}.csv'.format(
+                    semester_code, queue_code, affiliation_code))
+
+            logger.debug('Writing file {}', filename)
+            with open(filename, 'w') as file_:
+                print(make_csv(
+                    proposals[affiliation_id],
+                    institutions[affiliation_id],
+                    OrderedDict(
+                        (k, v) for (k, v) in affiliations.items()
+                        if k != affiliation_id)), file=file_)
+
+    else:
+        all_institutions = OrderedDict()
+        for affiliation_id in selected:
+            all_institutions.update(institutions[affiliation_id])
+
+        print(make_csv(
+            [dict(x, affiliation=selected[affiliation_id])
+             for affiliation_id in selected
+             for x in proposals[affiliation_id]],
+            all_institutions, affiliations, combined=True))
+
+    profiler.end_phase()
+    profiler.report()
+
+
+def make_csv(proposals, institutions, affiliations, combined=False):
+    """
+    Prepare a CSV file of proposal statistics.
+
+    If the `combined` option is specified, a leading column gives the
+    affiliation for which the statistics were computed.
+    """
+
+    from hedwig.file.csv import CSVWriter
+
+    writer = CSVWriter()
+
+    titles = [
+        'Proposal',
+        'PI',
+        'CoIs',
+        'Total CoIs',
+        'PI students',
+        'CoI students',
+        'Accepted',
+        'Request',
+        'Allocation',
+    ]
+
+    if combined:
+        titles.insert(0, 'Affiliation')
+
+    for institution_name in institutions.values():
+        titles.append(institution_name)
+
+    for affiliation_name in affiliations.values():
+        titles.append(affiliation_name)
+
+    writer.add_row(titles)
+
+    for proposal in proposals:
+        row = [
+            proposal['code'],
+            (1 if proposal['pi'] else None),
+            (proposal['cois'] if proposal['cois'] else None),
+            proposal['n_coi'],
+            (1 if proposal['pi_student'] else None),
+            (proposal['coi_students'] if proposal['coi_students'] else None),
+            (1 if proposal['accepted'] else 0),
+            proposal['request'],
+            proposal['allocation'],
+        ]
+
+        if combined:
+            row.insert(0, proposal['affiliation'])
+
+        for institution in institutions.keys():
+            row.append(proposal['n_inst'].get(institution))
+
+        for affiliation in affiliations.keys():
+            row.append(proposal['n_affil'].get(affiliation))
+
+        writer.add_row(row)
+
+    return writer.get_csv()
+
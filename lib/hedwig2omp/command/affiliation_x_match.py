@@ -0,0 +1,115 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+affiliation_x_match - Tabulate CoI affiliations by PI affiliation
+
+Reads one or more proposal list files, as written by the make_proj_def
+--output-json option, or directories, as written by the --output-columnar
+option, each of which is treated as a separate semester.
+
+Usage:
+    affiliation_x_match [-v | -q] [--accepted] [--student]
+        [--fraction] [--trend]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+        <filename>...
+
+Options:
+
+    --accepted                        Include only accepted proposals
+    --student                         Include only student CoIs
+    --fraction                        Give fractions rather than counts
+    --trend                           Tabulate CoIs by PI affiliation for each semester
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import csv
+import logging
+import os
+import sys
+
+from docopt import docopt
+
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level
+from hedwig2omp.instrument import Profiler
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+    logger = get_logger('affiliation_x_match')
+
+    from hedwig2omp.affiliation_x_match import \
+        AffiliationCrossMatch, normalize
+
+    profiler = Profiler.from_args(args)
+
+    x_match = AffiliationCrossMatch()
+
+    with profiler.phase('read'):
+        for filename in args['<filename>']:
+            logger.debug('Reading file {}', filename)
+            if os.path.isdir(filename):
+                x_match.add_columnar(filename)
+            else:
+                x_match.add_file(filename)
+
+    profiler.start_phase('process')
+
+    counts = x_match.counts(
+        accepted_only=args['--accepted'], student_only=args['--student'])
+
+    order = x_match.sorted_affiliations()
+    affiliation_names = [x_match.affiliation_names[x] for x in order]
+
+    writer = csv.writer(sys.stdout, quoting=csv.QUOTE_NONNUMERIC)
+
+    if args['--trend']:
+        # Total CoIs for each PI affiliation: (semester, PI affiliation).
+        table = counts.sum(axis=2)[:, order]
+        if args['--fraction']:
+            table = normalize(table, axis=1)
+
+        writer.writerow(['Semester'] + affiliation_names)
+
+        for (semester, row) in zip(x_match.semesters, table):
+            writer.writerow([semester] + row.tolist())
+
+    else:
+        # Sum over semesters: (PI affiliation, CoI affiliation).
+        table = counts.sum(axis=0)[order][:, order]
+        if args['--fraction']:
+            table = normalize(table, axis=1)
+
+        writer.writerow(['PI affiliation'] + affiliation_names)
+
+        for (pi_affiliation, row) in zip(affiliation_names, table):
+            writer.writerow([pi_affiliation] + row.tolist())
+
+    profiler.end_phase()
+    profiler.report()
+
@@ -0,0 +1,240 @@
+# Copyright (C) 2016-2023 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+export_pdf - Export proposal or review PDF files
+
+Usage:
+    export_pdf [-v | -q] --facility <facility> --semester <semester> --queue <queue> --type <type>
+        [--review]
+        [--output <directory>]
+        [--jobs <number>]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    export_pdf [-v | -q] --facility <facility> --project <project>
+        [--review]
+        [--output <directory>]
+        [--jobs <number>]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+    --facility <facility>             Facility code
+    --semester <semester>             Semester code
+    --queue <queue>                   Queue code
+    --type <type>                     Call type code
+    --project <project>               Specific project identifier
+    --output, -o <directory>          Output directory
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+    --review                          Generate review PDF instead of proposal
+    --jobs, -j <number>               Number of worker processes [default: 1]
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import logging
+import os
+import sys
+from time import time
+
+from docopt import docopt
+
+from hedwig.compat import first_value
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level, get_multiprocessing_context
+from hedwig2omp.instrument import Profiler
+
+pdf_writer = None
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+
+    logger = get_logger('export_pdf')
+
+    from hedwig.config import get_database, get_facilities
+    from hedwig.error import NoSuchValue
+    from hedwig.type.enum import ProposalState
+
+    n_jobs = int(args['--jobs'])
+    if n_jobs < 1:
+        logger.error('Number of jobs must be positive')
+        sys.exit(1)
+
+    profiler = Profiler.from_args(args)
+    profiler.start_phase('setup')
+
+    db = profiler.wrap(get_database(), 'db')
+    facility_info = first_value(get_facilities(facility_spec=args['--facility']))
+    facility = facility_info.view
+
+    profiler.end_phase()
+    profiler.start_phase('select')
+
+    query_kwargs = {
+        'facility_id': facility_info.id,
+    }
+
+    if args['--project'] is None:
+        try:
+            call_type = facility.get_call_types().by_code(
+                None if args['--type'] == 'NONE' else args['--type'])
+        except NoSuchValue:
+            logger.error('Type "{}" not recognised', args['--type'])
+            sys.exit(1)
+
+        semester_code = args['--semester']
+        queue_code = args['--queue']
+
+        logger.debug('Finding proposals for this call')
+        proposal_collection = db.search_proposal(
+            call_type=call_type,
+            semester_code=semester_code,
+            queue_code=queue_code,
+            state=ProposalState.submitted_states(),
+            **query_kwargs)
+
+    else:
+        logger.debug('Searching for specific proposal by identifier')
+
+        project_code = args['--project']
+        proposal_collection = db.search_proposal(
+            proposal_id=facility.parse_proposal_code(db, project_code),
+            **query_kwargs)
+
+    output_dir = args['--output']
+
+    tasks = []
+    for proposal in proposal_collection.values():
+        code = facility.make_proposal_code(db, proposal)
+        filename = os.path.join(
+            output_dir, '{}.pdf'.format(code.replace('/', '').lower()))
+        tasks.append((proposal.id, code, filename, args['--review']))
+
+    profiler.end_phase()
+
+    logger.info(
+        'Preparing {} PDF file(s) using {} process(es)',
+        len(tasks), n_jobs)
+
+    profiler.start_phase('process')
+
+    time_start = time()
+    n_done = 0
+    failures = []
+
+    if n_jobs == 1:
+        init_worker()
+        results = (export_proposal(x) for x in tasks)
+        pool = None
+    else:
+        # Start the workers with the "spawn" method, where available,
+        # so that each opens its own database connection rather than
+        # inheriting this process's connection.
+        pool = get_multiprocessing_context().Pool(
+            processes=n_jobs, initializer=init_worker,
+            initargs=(logging.getLogger().level,))
+        results = pool.imap_unordered(export_proposal, tasks)
+
+    try:
+        for (code, duration, error) in results:
+            if error is None:
+                n_done += 1
+                logger.info(
+                    'Wrote PDF for proposal {} ({:.1f} s)', code, duration)
+            else:
+                failures.append((code, error))
+                logger.error(
+                    'Failed to prepare PDF for proposal {}: {}', code, error)
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    profiler.end_phase()
+
+    time_total = time() - time_start
+
+    logger.info(
+        'Wrote {} of {} PDF file(s) in {:.1f} s'
+        ' ({:.1f} s per proposal, {:.1f} proposals per minute)',
+        n_done, len(tasks), time_total,
+        (time_total / len(tasks) if tasks else 0.0),
+        (60.0 * n_done / time_total if time_total > 0 else 0.0))
+
+    profiler.report()
+
+    if failures:
+        logger.error('Failed to prepare {} PDF file(s): {}', len(failures),
+                     ', '.join(code for (code, error) in failures))
+        sys.exit(1)
+
+
+def init_worker(log_level=None):
+    """
+    Prepare a PDF writer, with its own database connection, for this
+    process.
+
+    If a logging level is given, logging is configured at that level
+    (for worker processes which do not inherit the configuration).
+    """
+
+    global pdf_writer
+
+    if log_level is not None:
+        logging.basicConfig(level=log_level)
+
+    from hedwig.config import get_pdf_writer
+
+    pdf_writer = get_pdf_writer()
+
+
+def export_proposal(task):
+    """
+    Generate a PDF file for a proposal (or its reviews) and write it
+    to the given file.
+
+    Returns a tuple of the proposal code, time taken and an error
+    message (or `None` if successful).
+    """
+
+    (proposal_id, code, filename, review) = task
+
+    time_start = time()
+
+    try:
+        if review:
+            pdf = pdf_writer.reviews(proposal_id)
+        else:
+            pdf = pdf_writer.proposal(proposal_id)
+
+        with open(filename, 'wb') as f:
+            f.write(pdf)
+
+    except Exception as e:
+        return (code, time() - time_start, '{}: {}'.format(
+            type(e).__name__, e))
+
+    return (code, time() - time_start, None)
+
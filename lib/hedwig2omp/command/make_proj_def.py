@@ -0,0 +1,381 @@
+# Copyright (C) 2015-2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+make_proj_def - Export project definition file from Hedwig database
+
+Usage:
+    make_proj_def [-v | -q] --facility <facility> --semester <semester> --queue <queue> --type <type>
+        [--output <filename>]
+        [--diff-against <filename>] [--output-changed <filename>]
+        [--output-continuation <filename>]
+        [--output-affiliations <filename>]
+        [--output-targets <filename>]
+        [--output-targets-icrs <filename>] [--output-overlap <filename>]
+        [--target-tolerance <arcsec>]
+        [--output-notes <filename>]
+        [--output-feedback <filename>]
+        [--output-publications <filename>]
+        [--output-json <filename] [--json-format <format>]
+        [--output-columnar <directory>]
+        [--include-exempt-affiliations]
+        [--skip-unknown-cois]
+        [--skip-unknown-pis]
+        [--all-reviews]
+        [--state <state>]
+        [--decision-accept]
+        [--dummy-allocation | --request-allocation]
+        [--chunk-size <number>] [--prefetch-threads <number>]
+        [--incremental <manifest>] [--change-report <filename>]
+        [--processes <number>]
+        [--refresh-users]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    make_proj_def [-v | -q] --facility <facility> --project <project>...
+        [--output <filename>]
+        [--diff-against <filename>] [--output-changed <filename>]
+        [--output-continuation <filename>]
+        [--output-affiliations <filename>]
+        [--output-targets <filename>]
+        [--output-targets-icrs <filename>] [--output-overlap <filename>]
+        [--target-tolerance <arcsec>]
+        [--output-notes <filename>]
+        [--output-feedback <filename>]
+        [--output-publications <filename>]
+        [--output-json <filename] [--json-format <format>]
+        [--output-columnar <directory>]
+        [--include-exempt-affiliations]
+        [--skip-unknown-cois]
+        [--skip-unknown-pis]
+        [--dummy-allocation | --request-allocation]
+        [--chunk-size <number>] [--prefetch-threads <number>]
+        [--incremental <manifest>] [--change-report <filename>]
+        [--refresh-users]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+
+    --facility <facility>             Facility code
+    --semester <semester>             Semester code
+    --queue <queue>                   Queue code(s), comma-separated, or "all"
+    --type <type>                     Call type code(s), comma-separated
+    --project <project>...            Specific project identifier(s)
+    --output, -o <filename>           Output filename
+    --diff-against <filename>         Show differences from an existing project definition file
+    --output-changed <filename>       File to which to write only added and changed projects (with --diff-against)
+    --output-continuation <filename>  File to which to write continuation requests
+    --output-affiliations <filename>  File to which to write affiliations
+    --output-targets <filename>       File to which to write targets
+    --output-targets-icrs <filename>  File to which to write targets in ICRS, marking duplicates
+    --output-overlap <filename>       File to which to write duplicate targets (CSV)
+    --target-tolerance <arcsec>       Separation within which targets are duplicates [default: 5]
+    --output-notes <filename>         File to which to write TAC notes
+    --output-feedback <filename>      File to which to write TAC feedback
+    --output-publications <filename>  File to which to write publication information
+    --output-json <filename>          File to which to write proposal list as JSON
+    --json-format <format>            JSON format: indent, compact or lines [default: indent]
+    --output-columnar <directory>     Directory in which to write proposal list as column tables
+    --include-exempt-affiliations     Include affiliations for exempt proposals
+    --skip-unknown-cois               Don't abort when CoIs not recognised
+    --skip-unknown-pis                Don't abort when PIs not recognised
+    --state <state>                   Select proposals of given state [default: accepted]
+    --decision-accept                 Select only proposals marked as being accepted
+    --all-reviews                     Export all reviews in JSON output
+    --dummy-allocation                If the allocation is missing, use a dummy value
+    --request-allocation              If the allocation is missing, use request values
+    --chunk-size <number>             Process proposals in batches of this size
+    --prefetch-threads <number>       Number of concurrent prefetch queries (default: all)
+    --incremental <manifest>          Only recompute proposals changed since the run recorded in the manifest
+    --change-report <filename>        Write added, changed and removed projects (with --incremental)
+    --processes <number>              Number of worker processes for multiple calls (default: all)
+    --refresh-users                   Refresh the local user lookup snapshot
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+
+Multiple calls can be exported together by giving several queue and/or
+type codes.  (The queue code "all" selects the queues listed in the
+configuration file.)  In this case the names of the output files
+(and manifest and change report) must include "{queue}" and/or "{type}"
+as required to make them distinct.  These are replaced with the
+queue and type codes for each call, and "{semester}" is replaced with
+the semester code.  The calls are exported in parallel by worker
+processes, sharing the configuration and user lookup table.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import logging
+from multiprocessing.pool import ThreadPool
+import sys
+from time import time
+
+from docopt import docopt
+
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level, get_multiprocessing_context
+from hedwig2omp.instrument import Profiler
+
+logger = get_logger('make_proj_def')
+
+# Options giving file names which must be distinct for each call
+# in a batch.
+call_file_options = (
+    '--output',
+    '--diff-against',
+    '--output-changed',
+    '--output-continuation',
+    '--output-affiliations',
+    '--output-targets',
+    '--output-targets-icrs',
+    '--output-overlap',
+    '--output-notes',
+    '--output-feedback',
+    '--output-publications',
+    '--output-json',
+    '--output-columnar',
+    '--incremental',
+    '--change-report',
+)
+
+_worker_session = None
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    logging.basicConfig(level=get_log_level(args))
+
+    from hedwig2omp.session import Session
+
+    run(args, Session())
+
+
+def run(args, session):
+    if args['--project'] == []:
+        calls = get_calls(args, session.config)
+
+        if not calls:
+            logger.error('No queues selected')
+            sys.exit(1)
+
+        elif len(calls) > 1:
+            run_batch(args, session, calls)
+            return
+
+        # For a single call, the file names are used as given.
+        args = get_call_args(args, *calls[0], substitute=False)
+
+    run_call(args, session)
+
+
+def run_call(args, session):
+    """
+    Export a single call (or list of projects).
+    """
+
+    from hedwig2omp.proj_def import export_proj_def
+
+    profiler = Profiler.from_args(args)
+    profiler.start_phase('setup')
+
+    logger.debug('Reading configuration')
+    config = session.config
+
+    # Read the user lookup table in the background while the proposals
+    # are being selected.
+    user_pool = ThreadPool(1)
+    users = user_pool.apply_async(session.get_users, (), {
+        'refresh': args['--refresh-users'], 'profiler': profiler})
+
+    try:
+        db = profiler.wrap(session.db, 'db')
+        facility_info = session.get_facility(args['--facility'])
+
+        profiler.end_phase()
+
+        export_proj_def(
+            args, db, facility_info, users.get, config, profiler)
+
+    finally:
+        user_pool.terminate()
+        user_pool.join()
+
+    profiler.report()
+
+
+def get_calls(args, config):
+    """
+    Determine the list of calls, as tuples of queue and type code,
+    given by the `--queue` and `--type` options.
+    """
+
+    if args['--queue'].lower() == 'all':
+        queue_codes = [x.upper() for x in config.get_queue_codes()]
+    else:
+        queue_codes = [x.strip() for x in args['--queue'].split(',')]
+
+    type_codes = [x.strip() for x in args['--type'].split(',')]
+
+    return [(queue, type_) for queue in queue_codes for type_ in type_codes]
+
+
+def get_call_args(args, queue, type_, substitute=True):
+    """
+    Prepare the arguments for one call of a batch, substituting
+    the semester, queue and type codes into the file names
+    (if `substitute` is specified).
+    """
+
+    call_args = dict(args)
+    call_args['--queue'] = queue
+    call_args['--type'] = type_
+
+    if not substitute:
+        return call_args
+
+    for option in call_file_options:
+        if args[option] is not None:
+            call_args[option] = args[option].format(
+                semester=args['--semester'], queue=queue, type=type_)
+
+    return call_args
+
+
+def run_batch(args, session, calls):
+    """
+    Export multiple calls using a pool of worker processes.
+
+    The user lookup table is read before starting the workers,
+    so that it is only read once.  The workers are started with the
+    "spawn" method, where available, so that they do not inherit
+    the database connection.  When running in the server, the calls
+    are exported in turn by the server process.
+    """
+
+    call_args = [get_call_args(args, *call) for call in calls]
+
+    for option in call_file_options:
+        filenames = [x[option] for x in call_args if x[option] is not None]
+        if '-' in filenames or len(set(filenames)) != len(filenames):
+            logger.error(
+                'File names for {} must be distinct for each call '
+                '(using {{queue}} or {{type}})', option)
+            sys.exit(1)
+
+    processes = len(calls)
+    if args['--processes'] is not None:
+        processes = int(args['--processes'])
+        if processes < 1:
+            logger.error('Number of processes must be positive')
+            sys.exit(1)
+
+    if session.persistent and processes > 1:
+        logger.debug('Not starting worker processes in the server')
+        processes = 1
+
+    profiler = Profiler.from_args(args)
+
+    with profiler.phase('setup'):
+        # Check the facility here, before starting the workers.
+        session.get_facility(args['--facility'])
+        users = session.get_users(refresh=args['--refresh-users'])
+
+    logger.info(
+        'Exporting {} calls using {} process(es)', len(calls), processes)
+
+    if processes == 1:
+        results = [_run_batch_call(x, session) for x in call_args]
+
+    else:
+        # Release the database connection before starting the workers,
+        # in case they have to be started by forking this process.
+        session.invalidate('db')
+
+        pool = get_multiprocessing_context().Pool(
+            processes, _init_worker, (users, logging.getLogger().level))
+
+        try:
+            results = pool.map(_run_batch_call, call_args, chunksize=1)
+
+        finally:
+            pool.close()
+            pool.join()
+
+    n_failure = 0
+    for ((queue, type_), (status, duration)) in zip(calls, results):
+        profiler.record_phase('call:{}:{}'.format(queue, type_), duration)
+
+        if status:
+            logger.error('Export of call {} {} failed', queue, type_)
+            n_failure += 1
+
+    profiler.report()
+
+    if n_failure:
+        sys.exit(1)
+
+
+def _init_worker(users, log_level):
+    global _worker_session
+
+    logging.basicConfig(level=log_level)
+
+    from hedwig2omp.session import Session
+
+    _worker_session = Session(users=users)
+
+
+def _run_batch_call(args, session=None):
+    """
+    Export one call of a batch.
+
+    Returns a tuple of the exit status and the time taken.
+    """
+
+    if session is None:
+        session = _worker_session
+
+    logger.info('Exporting call {} {}', args['--queue'], args['--type'])
+
+    # Profiling is done for the batch as a whole, and the user lookup
+    # table has already been read (and refreshed if requested).
+    args = dict(args, **{
+        '--refresh-users': False,
+        '--profile': False,
+        '--profile-output': None,
+        '--profile-dump': None,
+    })
+
+    time_start = time()
+    status = 0
+
+    try:
+        run_call(args, session)
+
+    except SystemExit as e:
+        status = (e.code if isinstance(e.code, int) else 1)
+
+    except Exception:
+        logger.exception(
+            'Error exporting call {} {}', args['--queue'], args['--type'])
+        status = 1
+
+    return (status, time() - time_start)
@@ -0,0 +1,506 @@
+# Copyright (C) 2015-2024 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+match_users - Attempt to match Hedwig users to OMP accounts
+
+Usage:
+    match_users [-v | -q] --facility <facility> --semester <semester> --queue <queue> --type <type>
+        [--state <state>]
+        [--skip-unregistered]
+        [--decision-accept]
+        [--search-inferred] [--check-inferred]
+        [--candidates <filename>]
+        [--refresh-users]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    match_users [-v | -q] --facility <facility> --project <project>...
+        [--skip-unregistered]
+        [--search-inferred] [--check-inferred]
+        [--candidates <filename>]
+        [--refresh-users]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+    match_users [-v | -q] --apply <filename> [--refresh-users]
+        [--profile] [--profile-output <filename>] [--profile-dump <filename>]
+
+Options:
+
+    --facility <facility>             Facility code
+    --semester <semester>             Semester code
+    --queue <queue>                   Queue code
+    --type <type>                     Call type code
+    --project <project>...            Specific project identifier(s)
+    --state <state>                   Select proposals of given state [default: accepted]
+    --skip-unregistered, -r           Skip unregistered proposal members
+    --decision-accept                 Select only proposals marked as being accepted
+    --search-inferred                 Show matches for OMP-inferred name
+    --check-inferred                  Compare inferred names with the OMP (via taco)
+    --candidates <filename>           Write candidate matches to a CSV or JSON file
+                                      instead of prompting for each member
+    --apply <filename>                Store OMP IDs from a reviewed candidates file
+    --refresh-users                   Refresh the local user lookup snapshot
+    --profile                         Report time and queries for each phase
+    --profile-output <filename>       Write the profile report in JSON format
+    --profile-dump <filename>         Write cProfile statistics for main phase
+    --verbose, -v                     Increase verbosity
+    --quiet, -q                       Decreate verbosity
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict, defaultdict
+import csv
+import json
+import logging
+import sys
+
+from docopt import docopt
+
+from hedwig.compat import first_value, python_version, str_to_unicode
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_log_level
+from hedwig2omp.instrument import Profiler
+
+if not python_version < 3:
+    def raw_input(*args):
+        return input(*args)
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+
+    telescope = args['--facility']
+
+    logging.basicConfig(level=get_log_level(args))
+    logger = get_logger('match_users')
+
+    from hedwig.config import get_database, get_facilities
+    from hedwig.error import NoSuchValue
+    from hedwig.type.enum import ProposalState
+
+    from hedwig2omp.omp import OMPDB
+    from hedwig2omp.user import UserDB
+
+    profiler = Profiler.from_args(args)
+    profiler.start_phase('setup')
+
+    logger.debug('Reading user lookup table')
+    user_db = profiler.wrap(
+        UserDB(refresh=args['--refresh-users']), 'UserDB')
+    users = user_db.get_all_users()
+
+    if args['--apply'] is not None:
+        profiler.end_phase()
+
+        with profiler.phase('process'):
+            conflicts = apply_candidates(user_db, users, args['--apply'])
+
+        profiler.report()
+
+        if conflicts:
+            sys.exit(1)
+
+        return
+
+    logger.debug('Reading users from the OMP')
+    omp_user = profiler.wrap(OMPDB(), 'OMPDB').get_users_by_email(
+        lower_case=True)
+
+    omp_index = None
+    if args['--search-inferred'] or args['--check-inferred']:
+        from hedwig2omp.omp_id import OMPUserIndex
+
+        with profiler.phase('index'):
+            omp_index = OMPUserIndex(omp_user.values())
+
+    taco_omp = None
+    if args['--check-inferred']:
+        from taco import Taco
+        taco_omp = Taco('perl')
+        taco_omp.import_module('JAC::Setup', 'omp')
+        taco_omp.import_module('OMP::User')
+
+    logger.debug('Connecting to Hedwig database')
+    db = profiler.wrap(get_database(), 'db')
+    facility_info = first_value(get_facilities(facility_spec=telescope))
+    facility = facility_info.view
+
+    profiler.end_phase()
+    profiler.start_phase('select')
+
+    query_kwargs = {
+        'facility_id': facility_info.id,
+        'with_members': True,
+    }
+
+    if args['--project'] == []:
+        semester_code = str_to_unicode(args['--semester'])
+        queue_code = str_to_unicode(args['--queue'])
+
+        state = ProposalState.by_name(args['--state'])
+        if state is None:
+            logger.error('State "{}" not recognised', args['--state'])
+            sys.exit(1)
+
+        try:
+            call_type = facility.get_call_types().by_code(
+                None if args['--type'] == 'NONE' else args['--type'])
+        except NoSuchValue:
+            logger.error('Type "{}" not recognised', args['--type'])
+            sys.exit(1)
+
+        logger.debug('Finding proposals for this call')
+
+        proposal_collection = db.search_proposal(
+            semester_code=semester_code,
+            queue_code=queue_code,
+            call_type=call_type,
+            state=state,
+            decision_accept=(True if args['--decision-accept'] else None),
+            **query_kwargs)
+
+    else:
+        logger.debug('Searching for specific proposal by identifier')
+
+        proposal_ids = []
+        for project_code in args['--project']:
+            proposal_ids.append(facility.parse_proposal_code(
+                db, str_to_unicode(project_code)))
+
+        proposal_collection = db.search_proposal(
+            proposal_id=proposal_ids,
+            **query_kwargs)
+
+    profiler.end_phase()
+
+    if args['--candidates'] is not None:
+        with profiler.phase('process'):
+            candidates = find_candidates(
+                db, facility, proposal_collection, users, omp_user,
+                args['--skip-unregistered'], omp_index, taco_omp)
+
+        with profiler.phase('write'):
+            write_candidates(args['--candidates'], candidates)
+
+        profiler.report()
+        return
+
+    profiler.start_phase('process')
+
+    considered = set()
+    for proposal in proposal_collection.values():
+        logger.info(
+            'Checking members of proposal {}',
+            facility.make_proposal_code(db, proposal))
+        for member in proposal.members.values():
+            if args['--skip-unregistered'] and not member.person_registered:
+                continue
+
+            person_id = member.person_id
+            if person_id in considered:
+                continue
+            considered.add(person_id)
+
+            if person_id in users:
+                logger.debug('User already recognised: {} ({} = {})',
+                             person_id, member.person_name,
+                             users[person_id])
+                continue
+
+            # Look for direct email matches between this person and the OMP.
+            addresses = []
+            for email in db.search_email(person_id=person_id).values():
+                address = email.address
+                addresses.append(address)
+                omp_id = omp_user.get(address.lower())
+                if omp_id is None:
+                    continue
+
+                omp_id = omp_id.id
+
+                logger.info('Found match by email address: {} ({} = {}, {})',
+                            person_id, member.person_name, omp_id, address)
+
+                response = raw_input(
+                    'Store OMP ID {} for {} [y/N]: '.format(
+                        omp_id,
+                        member.person_name))
+                if response.upper().startswith('Y'):
+                    user_db.add_user(person_id, omp_id)
+                    break
+
+            else:
+                # Attempt to cross-reference with other Hedwig users by email.
+                for email in db.search_email(person_id=None,
+                                             address=addresses).values():
+                    if email.person_id == person_id:
+                        continue
+
+                    omp_id = users.get(email.person_id)
+                    if omp_id is None:
+                        continue
+
+                    logger.info('Found possible cross-reference: '
+                                '{} = {} ({} = {}, {})',
+                                person_id, email.person_id,
+                                member.person_name, omp_id, address)
+
+                    response = raw_input(
+                        'Store OMP ID {} for {} [y/N]: '.format(
+                            omp_id,
+                            member.person_name))
+                    if response.upper().startswith('Y'):
+                        user_db.add_user(person_id, omp_id)
+                        break
+
+                else:
+                    logger.info('No match found for: {} ({}: {})',
+                                person_id, member.person_name,
+                                ', '.join(addresses))
+
+                    if omp_index is not None:
+                        (omp_id_inferred, possible) = find_inferred(
+                            omp_index, member.person_name, taco_omp)
+                        logger.info('OMP-inferred name: {}', omp_id_inferred)
+                        for match in possible:
+                            logger.info(
+                                'Possible match: {} ({}) by {}, {:.2f}',
+                                match.user.id, match.user.name,
+                                match.match, match.score)
+
+                    omp_id = raw_input(
+                        'OMP ID for {}: '.format(
+                            member.person_name))
+                    if omp_id:
+                        if len(omp_id) < 3:
+                            logger.warning(
+                                'OMP ID not 3 characters long, skipping...')
+                        else:
+                            user_db.add_user(person_id, omp_id.upper())
+                    else:
+                        logger.info('No OMP ID entered, skipping...')
+
+    profiler.end_phase()
+    profiler.report()
+
+
+def find_inferred(omp_index, person_name, taco_omp=None):
+    """
+    Find OMP users whose ID starts with the OMP-inferred ID for the
+    given name, or whose name is similar.
+
+    If a `taco_omp` object is given, the inferred ID is compared
+    with that given by `OMP::User->infer_userid`.
+
+    Returns a tuple of the inferred ID and a list of `OMPUserMatch` tuples.
+    """
+
+    (omp_id_inferred, possible) = omp_index.search(person_name)
+
+    if taco_omp is not None:
+        omp_id_perl = taco_omp.call_class_method(
+            'OMP::User', 'infer_userid', person_name)
+
+        if omp_id_perl != omp_id_inferred:
+            get_logger('match_users').warning(
+                'Inferred ID {} for {} differs from OMP value {}',
+                omp_id_inferred, person_name, omp_id_perl)
+
+    return (omp_id_inferred, possible)
+
+
+def find_candidates(
+        db, facility, proposal_collection, users, omp_user,
+        skip_unregistered, omp_index, taco_omp=None):
+    """
+    Find candidate OMP IDs for all unrecognised proposal members.
+
+    The email addresses of all of the members are fetched together,
+    and then a single query is used to look for the same addresses
+    belonging to other Hedwig users (for cross-referencing).
+
+    Returns a list of dictionaries, one per member, with the best
+    candidate OMP ID (if any) filled in.
+    """
+
+    logger = get_logger('match_users')
+
+    members = OrderedDict()
+    for proposal in proposal_collection.values():
+        code = facility.make_proposal_code(db, proposal)
+        for member in proposal.members.values():
+            if skip_unregistered and not member.person_registered:
+                continue
+
+            person_id = member.person_id
+            if person_id in users or person_id in members:
+                continue
+
+            members[person_id] = (member.person_name, code)
+
+    logger.info('Found {} unrecognised member(s)', len(members))
+    if not members:
+        return []
+
+    addresses = defaultdict(list)
+    for email in db.search_email(person_id=list(members.keys())).values():
+        addresses[email.person_id].append(email.address)
+
+    all_addresses = set()
+    for person_addresses in addresses.values():
+        all_addresses.update(person_addresses)
+
+    cross_references = defaultdict(list)
+    if all_addresses:
+        for email in db.search_email(
+                person_id=None, address=list(all_addresses)).values():
+            cross_references[email.address].append(email.person_id)
+
+    candidates = []
+    for (person_id, (person_name, code)) in members.items():
+        person_addresses = addresses.get(person_id, [])
+        matches = []
+
+        # Look for direct email matches between this person and the OMP.
+        for address in person_addresses:
+            omp_id = omp_user.get(address.lower())
+            if omp_id is not None:
+                matches.append((omp_id.id, 'email', address))
+
+        # Attempt to cross-reference with other Hedwig users by email.
+        if not matches:
+            for address in person_addresses:
+                for other_person_id in cross_references.get(address, ()):
+                    if other_person_id == person_id:
+                        continue
+
+                    omp_id = users.get(other_person_id)
+                    if omp_id is not None:
+                        matches.append((
+                            omp_id, 'cross-reference',
+                            '{} ({})'.format(other_person_id, address)))
+
+        inferred = []
+        if (not matches) and (omp_index is not None):
+            (omp_id_inferred, possible) = find_inferred(
+                omp_index, person_name, taco_omp)
+            inferred = [
+                '{} ({})'.format(x.user.id, x.user.name) for x in possible]
+
+        candidates.append(OrderedDict((
+            ('hedwig_id', person_id),
+            ('person_name', person_name),
+            ('proposal', code),
+            ('omp_id', (matches[0][0] if matches else '')),
+            ('match', (matches[0][1] if matches else 'none')),
+            ('detail', '; '.join(
+                ['{} {}'.format(omp_id, detail)
+                 for (omp_id, match, detail) in matches] +
+                inferred)),
+            ('email', ', '.join(person_addresses)),
+        )))
+
+    return candidates
+
+
+def write_candidates(filename, candidates):
+    """
+    Write candidate matches to a file, in JSON format if the filename
+    ends with ".json" or CSV format otherwise.
+    """
+
+    logger = get_logger('match_users')
+    logger.info('Writing {} candidate(s) to {}', len(candidates), filename)
+
+    if filename.lower().endswith('.json'):
+        with open(filename, 'w') as file_:
+            json.dump(candidates, file_, indent=4, separators=(',', ': '))
+
+    else:
+        with open(filename, 'w', newline='') as file_:
+            writer = csv.writer(file_)
+            writer.writerow((
+                'hedwig_id', 'person_name', 'proposal',
+                'omp_id', 'match', 'detail', 'email'))
+            for candidate in candidates:
+                writer.writerow(list(candidate.values()))
+
+
+def read_candidates(filename):
+    """
+    Read a candidate matches file, as written by `write_candidates`.
+    """
+
+    if filename.lower().endswith('.json'):
+        with open(filename, 'r') as file_:
+            return json.load(file_)
+
+    with open(filename, 'r', newline='') as file_:
+        return list(csv.DictReader(file_))
+
+
+def apply_candidates(user_db, users, filename):
+    """
+    Store the OMP IDs given in a (reviewed) candidate matches file.
+
+    Entries with an empty OMP ID are skipped.
+
+    Returns the list of entries which conflicted with existing mappings.
+    """
+
+    logger = get_logger('match_users')
+
+    pairs = []
+    for candidate in read_candidates(filename):
+        person_id = int(candidate['hedwig_id'])
+        omp_id = (candidate['omp_id'] or '').strip().upper()
+
+        if not omp_id:
+            logger.debug('No OMP ID for {} ({}), skipping...',
+                         person_id, candidate['person_name'])
+            continue
+
+        if len(omp_id) < 3:
+            logger.warning('OMP ID {} for {} not 3 characters long, skipping...',
+                           omp_id, candidate['person_name'])
+            continue
+
+        if person_id in users:
+            logger.warning('User already recognised: {} ({} = {})',
+                           person_id, candidate['person_name'],
+                           users[person_id])
+            continue
+
+        logger.info('Storing OMP ID {} for {} ({})',
+                    omp_id, person_id, candidate['person_name'])
+        pairs.append((person_id, omp_id))
+
+    (added, skipped, conflicts) = user_db.add_users(pairs)
+
+    for (person_id, omp_id, existing) in conflicts:
+        if existing is None:
+            logger.error('Conflicting entry for Hedwig user {}: {}'
+                         ' (other OMP IDs given)', person_id, omp_id)
+        else:
+            logger.error('Conflicting entry for Hedwig user {}: {}'
+                         ' (existing: {})', person_id, omp_id, existing)
+
+    logger.info('Stored {} OMP ID(s)', len(added))
+
+    return conflicts
+
@@ -1,4 +1,4 @@
-# Copyright (C) 2015 East Asian Observatory
+# Copyright (C) 2015-2026 East Asian Observatory
 # All Rights Reserved.
 #
 # This program is free software; you can redistribute it and/or modify it under
@@ -28,14 +28,190 @@ import os
 
 config = None
 
+known_sections = (
+    'queue_country',
+    'affiliation_code',
+    'user_cache',
+    'omp_user_cache',
+    'server',
+)
+
+
+class ConfigError(Exception):
+    """
+    Exception raised for invalid configuration.
+    """
+
+    pass
+
+
+class Config(object):
+    """
+    Parsed and validated hedwig2omp configuration.
+
+    The `queue_country` and `affiliation_code` sections are indexed
+    when the configuration is read, with affiliations mapped in both
+    directions between code and name.  Other settings can be read using
+    the `get`, `getint`, `has_option` and `options` methods, as for a
+    `ConfigParser`.
+
+    Instances can not be modified after construction.
+    """
+
+    def __init__(self, parser):
+        unknown = [x for x in parser.sections() if x not in known_sections]
+        if unknown:
+            raise ConfigError('Unknown configuration section(s): {}'.format(
+                ', '.join(unknown)))
+
+        queue_countries = {}
+        if parser.has_section('queue_country'):
+            for (queue_code, country) in parser.items('queue_country'):
+                if not country:
+                    raise ConfigError(
+                        'No country for queue "{}"'.format(queue_code))
+                queue_countries[queue_code] = country
+
+        affiliation_codes = []
+        affiliation_names = {}
+        affiliation_name_codes = {}
+        if parser.has_section('affiliation_code'):
+            for (code, name) in parser.items('affiliation_code'):
+                if not name:
+                    raise ConfigError(
+                        'No name for affiliation code "{}"'.format(code))
+                if name in affiliation_name_codes:
+                    raise ConfigError(
+                        'Affiliation name "{}" has codes "{}" and "{}"'.format(
+                            name, affiliation_name_codes[name], code))
+                affiliation_codes.append(code)
+                affiliation_names[code] = name
+                affiliation_name_codes[name] = code
+
+        object.__setattr__(self, '_parser', parser)
+        object.__setattr__(self, '_queue_countries', queue_countries)
+        object.__setattr__(self, '_affiliation_codes', tuple(affiliation_codes))
+        object.__setattr__(self, '_affiliation_names', affiliation_names)
+        object.__setattr__(self, '_affiliation_name_codes', affiliation_name_codes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Configuration can not be modified')
+
+    def __delattr__(self, name):
+        raise AttributeError('Configuration can not be modified')
+
+    def get(self, section, option):
+        return self._parser.get(section, option)
+
+    def getint(self, section, option):
+        return self._parser.getint(section, option)
+
+    def has_option(self, section, option):
+        return self._parser.has_option(section, option)
+
+    def has_section(self, section):
+        return self._parser.has_section(section)
+
+    def options(self, section):
+        return self._parser.options(section)
+
+    @property
+    def affiliation_codes(self):
+        """
+        Tuple of affiliation codes, in configuration file order.
+        """
+
+        return self._affiliation_codes
+
+    def get_affiliation_code(self, name, default=None):
+        """
+        Get the code for the affiliation with the given name.
+        """
+
+        return self._affiliation_name_codes.get(name, default)
+
+    def get_affiliation_name(self, code, default=None):
+        """
+        Get the name of the affiliation with the given code.
+        """
+
+        return self._affiliation_names.get(
+            self._parser.optionxform(code), default)
+
+    def get_queue_country(self, queue_code, default=None):
+        """
+        Get the OMP country code for a Hedwig queue.
+        """
+
+        return self._queue_countries.get(
+            self._parser.optionxform(queue_code), default)
+
+    def get_queue_codes(self):
+        """
+        Get a list of the queue codes, as normalized by the parser.
+        """
+
+        return list(self._queue_countries.keys())
+
+    def map_affiliation_codes(self, affiliations):
+        """
+        Map a collection of Hedwig affiliations to their codes.
+
+        Returns a tuple of a dictionary of codes by affiliation ID, for
+        those affiliations which were recognised, and a list of the
+        affiliations which were not.
+        """
+
+        codes = {}
+        unknown = []
+
+        for affiliation in affiliations.values():
+            code = self._affiliation_name_codes.get(affiliation.name)
+            if code is None:
+                unknown.append(affiliation)
+            else:
+                codes[affiliation.id] = code
+
+        return (codes, unknown)
+
 
 def get_config():
+    """
+    Get the hedwig2omp configuration.
+
+    The configuration file is read and validated on the first call,
+    raising `ConfigError` if it is not valid.  The same `Config` object
+    is returned by subsequent calls.
+    """
+
     global config
 
     if config is None:
-        dir_ = os.environ.get('HEDWIG2OMP_DIR', os.getcwd())
-        file_ = os.path.join(dir_, 'etc', 'hedwig2omp.ini')
-        config = ConfigParser()
-        config.read(file_)
+        file_ = get_path('etc', 'hedwig2omp.ini')
+        parser = ConfigParser()
+        parser.read(file_)
+        config = Config(parser)
 
     return config
+
+
+def clear_config():
+    """
+    Discard the configuration, so that the file is read again
+    by the next call to `get_config`.
+    """
+
+    global config
+
+    config = None
+
+
+def get_path(*path):
+    """
+    Get the path to a file relative to the hedwig2omp directory.
+
+    Absolute paths are returned unchanged.
+    """
+
+    dir_ = os.environ.get('HEDWIG2OMP_DIR', os.getcwd())
+    return os.path.join(dir_, *path)
@@ -0,0 +1,291 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+from hashlib import sha1
+import json
+import os
+import pickle
+
+from hedwig.util import get_logger
+
+logger = get_logger(__name__)
+
+manifest_version = 2
+
+# Arguments which do not affect the content of the output files.
+ignored_args = set((
+    '--incremental',
+    '--change-report',
+    '--diff-against',
+    '--output-changed',
+    '--chunk-size',
+    '--prefetch-threads',
+    '--processes',
+    '--refresh-users',
+    '--profile',
+    '--profile-output',
+    '--profile-dump',
+    '--verbose',
+    '--quiet',
+))
+
+
+def compute_hash(value):
+    """
+    Compute a hash of a value constructed from lists, dictionaries,
+    (named)tuples and simple types.
+    """
+
+    return sha1(json.dumps(
+        value, sort_keys=True, separators=(',', ':'), default=str
+    ).encode('utf-8')).hexdigest()
+
+
+def args_context(args):
+    """
+    Select the command line arguments which affect the output.
+
+    Only the presence of output file options is included, not the
+    file names.
+    """
+
+    return {
+        k: ((v is not None) if k.startswith('--output') else v)
+        for (k, v) in args.items() if k not in ignored_args}
+
+
+def proposal_inputs(proposal, prefetched, users):
+    """
+    Gather the information on which the outputs for a proposal depend.
+    """
+
+    inputs = [
+        proposal,
+        None if proposal.members is None else [
+            (x.person_id, users.get(x.person_id))
+            for x in proposal.members.values()],
+    ]
+
+    for name in ('jcmt_allocations', 'jcmt_alloc_options',
+                 'jcmt_request_options', 'jcmt_requests', 'targets'):
+        collection = getattr(prefetched, name)
+        inputs.append(
+            None if collection is None else
+            collection.subset_by_proposal(proposal.id))
+
+    for name in ('prev_proposals', 'continuations_prev'):
+        collection = getattr(prefetched, name)
+        inputs.append(
+            None if collection is None else
+            collection.subset_by_this_proposal(proposal.id))
+
+        if name == 'continuations_prev' and collection is not None:
+            inputs.append([
+                prefetched.continued_proposals.get(x.proposal_id)
+                for x in collection.subset_by_this_proposal(
+                    proposal.id).values()])
+
+    return inputs
+
+
+class OutputSlices(object):
+    """
+    Record of the entries appended to a set of output lists for each
+    proposal processed.
+
+    `start` should be called before processing each proposal and `stop`
+    once it has been processed, before any entries for another proposal
+    (such as those reused from the manifest) are appended.
+    """
+
+    def __init__(self, *lists):
+        self.lists = lists
+        self.slices = OrderedDict()
+        self._code = None
+        self._starts = None
+
+    def start(self, code):
+        self.stop()
+
+        self._code = code
+        self._starts = [len(x) for x in self.lists]
+
+    def stop(self):
+        if self._code is None:
+            return
+
+        self.slices[self._code] = [
+            x[start:] for (x, start) in zip(self.lists, self._starts)]
+
+        self._code = None
+        self._starts = None
+
+    def pop_slices(self):
+        """
+        Get the entries recorded since the previous call.
+
+        Returns an ordered dictionary, by proposal code, of lists of
+        the entries appended to each output list.
+        """
+
+        self.stop()
+
+        (slices, self.slices) = (self.slices, OrderedDict())
+
+        return slices
+
+
+class ExportManifest(object):
+    """
+    Record of the per-proposal inputs of a previous export.
+
+    The manifest file (JSON) gives a hash of the inputs for each proposal
+    code, while a companion file (with suffix ".cache") stores the output
+    entries computed for each proposal.  A proposal whose hash matches
+    the previous export can then be reused rather than recomputed.
+
+    The hash for each proposal includes the export "context" (arguments,
+    configuration and affiliations) so that all proposals are recomputed
+    if any of these change.
+
+    The manifest also gives a hash of the project definitions
+    (and continuation requests) written for each proposal.  These are
+    used to determine which projects have changed, so that options which
+    only affect other outputs do not cause projects to be reported
+    as changed.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.cache_filename = filename + '.cache'
+        self.context = None
+
+        self.hashes = {}
+        self.project_hashes = {}
+        self.entries = {}
+
+        self.new_hashes = OrderedDict()
+        self.new_project_hashes = OrderedDict()
+        self.new_entries = {}
+
+        if os.path.exists(filename) and os.path.exists(self.cache_filename):
+            with open(filename, 'r') as f:
+                manifest = json.load(f)
+
+            if manifest.get('version') != manifest_version:
+                logger.warning('Ignoring manifest with different version')
+
+            else:
+                with open(self.cache_filename, 'rb') as f:
+                    self.entries = pickle.load(f)
+
+                self.hashes = manifest['proposals']
+                self.project_hashes = manifest['projects']
+
+        logger.debug(
+            'Read manifest with {} proposal(s)', len(self.hashes))
+
+    def set_context(self, *context):
+        self.context = compute_hash(context)
+
+    def lookup(self, code, inputs):
+        """
+        Compute the hash for a proposal and look up its stored output
+        entries.
+
+        Returns the entries if the hash is unchanged, or `None` otherwise,
+        in which case `record` should be called with the new entries.
+        """
+
+        hash_ = compute_hash([self.context, code, inputs])
+        self.new_hashes[code] = hash_
+
+        if self.hashes.get(code) != hash_:
+            return None
+
+        entry = self.entries.get(code)
+        if entry is not None:
+            self.record(code, entry)
+
+        return entry
+
+    def record(self, code, entry):
+        self.new_entries[code] = entry
+
+        if entry['project'] or entry['continuation']:
+            self.new_project_hashes[code] = compute_hash(
+                [entry['project'], entry['continuation']])
+
+    def get_changes(self):
+        """
+        Compare the project definition hashes with those of the previous
+        export.
+
+        Returns a dictionary of lists of added, changed and removed
+        project codes, and the number unchanged.
+        """
+
+        added = []
+        changed = []
+        n_unchanged = 0
+
+        for (code, hash_) in self.new_project_hashes.items():
+            previous = self.project_hashes.get(code)
+            if previous is None:
+                added.append(code)
+            elif previous != hash_:
+                changed.append(code)
+            else:
+                n_unchanged += 1
+
+        return OrderedDict((
+            ('added', added),
+            ('changed', changed),
+            ('removed', sorted(
+                x for x in self.project_hashes
+                if x not in self.new_project_hashes)),
+            ('unchanged', n_unchanged),
+        ))
+
+    def save(self):
+        """
+        Write the manifest and cache files, replacing the previous versions.
+        """
+
+        _write_atomic(self.cache_filename, 'wb', lambda f: pickle.dump(
+            self.new_entries, f, protocol=2))
+
+        _write_atomic(self.filename, 'w', lambda f: json.dump(
+            OrderedDict((
+                ('version', manifest_version),
+                ('context', self.context),
+                ('proposals', self.new_hashes),
+                ('projects', self.new_project_hashes),
+            )), f, indent=4, separators=(',', ': ')))
+
+
+def _write_atomic(filename, mode, writer):
+    tmp_filename = filename + '.tmp'
+
+    with open(tmp_filename, mode) as f:
+        writer(f)
+
+    os.rename(tmp_filename, filename)
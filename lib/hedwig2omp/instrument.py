@@ -0,0 +1,243 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import json
+import sys
+from threading import Lock
+from time import time
+
+
+class PhaseInfo(object):
+    """
+    Accumulated timing and call counts for a phase.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+        self.calls = OrderedDict()
+
+
+class Profiler(object):
+    """
+    Phase timer and counter of calls to wrapped objects.
+
+    Phases are entered using the `phase` context manager, or the
+    `start_phase` and `end_phase` methods.  Phases with the
+    same name are combined, and calls to wrapped objects are attributed
+    to the innermost phase.
+
+    If `dump_phase` and `dump_file` are given, that phase is also run
+    under cProfile and the statistics written to the file.
+
+    A disabled profiler returns objects unwrapped and does not
+    record anything.
+    """
+
+    def __init__(self, enabled=True, output_file=None,
+                 dump_phase=None, dump_file=None):
+        self.enabled = enabled
+        self.output_file = output_file
+        self.dump_phase = dump_phase
+        self.dump_file = dump_file
+
+        self.phases = OrderedDict()
+        self.stack = []
+        self.time_start = time()
+        self.lock = Lock()
+
+    @classmethod
+    def from_args(cls, args, dump_phase='process'):
+        """
+        Construct profiler based on the `--profile`, `--profile-output`
+        and `--profile-dump` command line options.
+        """
+
+        return cls(
+            enabled=(args['--profile'] or
+                     (args['--profile-output'] is not None) or
+                     (args['--profile-dump'] is not None)),
+            output_file=args['--profile-output'],
+            dump_phase=dump_phase,
+            dump_file=args['--profile-dump'])
+
+    def _get_phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseInfo()
+        return phase
+
+    @contextmanager
+    def phase(self, name):
+        self.start_phase(name)
+
+        try:
+            yield
+
+        finally:
+            self.end_phase()
+
+    def start_phase(self, name):
+        if not self.enabled:
+            return
+
+        profile = None
+        if (self.dump_file is not None) and (name == self.dump_phase):
+            from cProfile import Profile
+            profile = Profile()
+            profile.enable()
+
+        self.stack.append((name, time(), profile))
+
+    def end_phase(self):
+        if not self.enabled:
+            return
+
+        (name, time_start, profile) = self.stack.pop()
+
+        self._get_phase(name).time += time() - time_start
+
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(self.dump_file)
+
+    def record_phase(self, name, duration):
+        """
+        Record the duration of a phase which was timed separately,
+        for example in another thread.
+        """
+
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self._get_phase(name).time += duration
+
+    def wrap(self, obj_, name):
+        """
+        Wrap an object so that calls to its public methods are counted.
+        """
+
+        if not self.enabled:
+            return obj_
+
+        return CountingProxy(obj_, name, self)
+
+    def record_call(self, name, duration, result):
+        """
+        Record a call in the current phase.
+
+        This may be called from other threads while the main thread
+        is waiting within a phase.
+        """
+
+        with self.lock:
+            phase = self._get_phase(self.stack[-1][0] if self.stack else '')
+
+            entry = phase.calls.get(name)
+            if entry is None:
+                entry = phase.calls[name] = {
+                    'calls': 0, 'rows': 0, 'time': 0.0}
+
+            entry['calls'] += 1
+            entry['time'] += duration
+
+            # Count the entries of collections (including Hedwig's
+            # ResultCollection, a dictionary) and otherwise one row for
+            # each result, such as a single tuple.
+            if isinstance(result, (dict, list)):
+                entry['rows'] += len(result)
+            elif result is not None:
+                entry['rows'] += 1
+
+    def get_report(self):
+        return OrderedDict((
+            ('total', time() - self.time_start),
+            ('phases', [
+                OrderedDict((
+                    ('name', name),
+                    ('time', info.time),
+                    ('calls', info.calls),
+                )) for (name, info) in self.phases.items()]),
+        ))
+
+    def report(self, file_=None):
+        """
+        Write the profile report, as a table to the given file
+        (or standard error) and in JSON format to the output file
+        if one was specified.
+        """
+
+        if not self.enabled:
+            return
+
+        report = self.get_report()
+
+        if self.output_file is not None:
+            with open(self.output_file, 'w') as f:
+                json.dump(report, f, indent=4, separators=(',', ': '))
+
+        if file_ is None:
+            file_ = sys.stderr
+
+        print('{:40} {:>8} {:>8} {:>10}'.format(
+            'Phase / call', 'Calls', 'Rows', 'Time (s)'), file=file_)
+
+        for phase in report['phases']:
+            print('{:40} {:>8} {:>8} {:10.3f}'.format(
+                phase['name'] or '(none)', '', '', phase['time']), file=file_)
+
+            for (name, entry) in phase['calls'].items():
+                print('    {:36} {:8d} {:8d} {:10.3f}'.format(
+                    name, entry['calls'], entry['rows'], entry['time']),
+                    file=file_)
+
+        print('{:40} {:>8} {:>8} {:10.3f}'.format(
+            'Total', '', '', report['total']), file=file_)
+
+
+class CountingProxy(object):
+    """
+    Proxy for an object, recording calls to its public methods
+    via a `Profiler`.
+    """
+
+    def __init__(self, obj_, name, profiler):
+        self._obj = obj_
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, attr):
+        value = getattr(self._obj, attr)
+
+        if attr.startswith('_') or not callable(value):
+            return value
+
+        name = '{}.{}'.format(self._name, attr)
+        profiler = self._profiler
+
+        def wrapper(*args, **kwargs):
+            time_start = time()
+            result = value(*args, **kwargs)
+            profiler.record_call(name, time() - time_start, result)
+            return result
+
+        return wrapper
@@ -1,4 +1,4 @@
-# Copyright (C) 2015 East Asian Observatory
+# Copyright (C) 2015-2026 East Asian Observatory
 # All Rights Reserved.
 #
 # This program is free software; you can redistribute it and/or modify it under
@@ -19,33 +19,136 @@ from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
 from collections import namedtuple
+import json
+import os
+from time import time
+
+from hedwig.util import get_logger
 
 from omp.db.part.arc import ArcDB
 
+from hedwig2omp.config import get_config, get_path
+
+logger = get_logger(__name__)
 
 OMPUser = namedtuple('OMPUser', ('id', 'name'))
 
+default_cache_ttl = 3600
+
 
 class OMPDB(object):
+    """
+    Access to the OMP database.
+
+    If the configuration file has an `omp_user_cache` section giving a
+    `file`, the OMP user table is cached there by `get_users_by_email`.
+    The cache is read again from the OMP database when older than the
+    `ttl` (in seconds).
+    """
+
     def __init__(self):
         self.db = ArcDB()
 
-    def get_users_by_email(self):
-        result = {}
+        config = get_config()
+
+        self.cache_file = None
+        self.cache_ttl = default_cache_ttl
+        if config.has_option('omp_user_cache', 'file'):
+            self.cache_file = get_path(config.get('omp_user_cache', 'file'))
+
+            if config.has_option('omp_user_cache', 'ttl'):
+                self.cache_ttl = config.getint('omp_user_cache', 'ttl')
+
+    def get_users_by_email(self, lower_case=False, batch_size=1000):
+        """
+        Get a dictionary of `OMPUser` tuples by email address.
+
+        If `lower_case` is specified, the email addresses are converted
+        to lower case.
+
+        If a cache file is configured, it is used if it is not older than
+        the TTL and the number of users and the maximum user ID match
+        the OMP database.  (Changes to the email addresses of existing
+        users are therefore only detected once the cache expires.)
+        """
+
+        rows = None
+
+        if self.cache_file is not None:
+            key = self._get_cache_key()
+            rows = self._read_cache(key)
+
+            if rows is None:
+                rows = list(self._iter_users(batch_size))
+                self._write_cache(key, rows)
+
+        else:
+            rows = self._iter_users(batch_size)
 
+        if lower_case:
+            return {
+                email.lower(): OMPUser(userid, uname)
+                for (email, userid, uname) in rows}
+
+        return {
+            email: OMPUser(userid, uname)
+            for (email, userid, uname) in rows}
+
+    def _iter_users(self, batch_size):
         with self.db.db.transaction() as c:
             c.execute('SELECT u.email, u.userid, u.uname'
                       ' FROM omp.ompuser AS u'
-                      ' WHERE u.obfuscated=0')
+                      ' WHERE u.obfuscated=0 AND u.email IS NOT NULL')
 
             while True:
-                row = c.fetchone()
-                if row is None:
+                rows = c.fetchmany(batch_size)
+                if not rows:
                     break
 
-                if row[0] is None:
-                    continue
+                for row in rows:
+                    yield tuple(row)
+
+    def _get_cache_key(self):
+        with self.db.db.transaction() as c:
+            c.execute('SELECT COUNT(*), MAX(u.userid)'
+                      ' FROM omp.ompuser AS u'
+                      ' WHERE u.obfuscated=0 AND u.email IS NOT NULL')
+            (n_user, max_userid) = c.fetchone()
+
+        return [n_user, max_userid]
+
+    def _read_cache(self, key):
+        if not os.path.exists(self.cache_file):
+            return None
+
+        with open(self.cache_file, 'r') as file_:
+            cache = json.load(file_)
+
+        if cache.get('key') != key:
+            logger.debug('OMP user cache is out of date')
+            return None
+
+        if (time() - cache.get('written', 0)) > self.cache_ttl:
+            logger.debug('OMP user cache has expired')
+            return None
+
+        logger.debug('Using OMP user cache')
+        return cache['users']
+
+    def _write_cache(self, key, rows):
+        dir_ = os.path.dirname(self.cache_file)
+        if dir_ and not os.path.exists(dir_):
+            os.makedirs(dir_)
+
+        # Create the file readable only by the owner, since it contains
+        # the email addresses of all users.
+        temporary = self.cache_file + '.tmp'
+        if os.path.exists(temporary):
+            os.unlink(temporary)
 
-                result[row[0]] = OMPUser(row[1], row[2])
+        with os.fdopen(os.open(
+                temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600),
+                'w') as file_:
+            json.dump({'key': key, 'written': time(), 'users': rows}, file_)
 
-        return result
+        os.rename(temporary, self.cache_file)
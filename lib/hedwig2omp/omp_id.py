@@ -0,0 +1,237 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+import re
+import unicodedata
+
+OMPUserMatch = namedtuple('OMPUserMatch', ('user', 'score', 'match'))
+
+name_separator = re.compile(r'[^A-Z0-9]+')
+id_invalid = re.compile(r'[^A-Z0-9]')
+
+# Minimum name similarity for a match not found by ID prefix.
+min_similarity = 0.3
+
+
+def strip_accents(text):
+    """
+    Remove accents from the given text.
+
+    The OMP removes accented characters, so decompose to remove accents
+    and then encode with ignore to remove any remaining non-ASCII
+    characters.
+    """
+
+    return unicodedata.normalize('NFKD', text).encode(
+        'ascii', 'ignore').decode('ascii')
+
+
+def normalize_name(name):
+    """
+    Normalize a name for comparison: remove accents, convert to upper
+    case and replace punctuation with single spaces.
+    """
+
+    return name_separator.sub(' ', strip_accents(name).upper()).strip()
+
+
+def infer_omp_id(name):
+    """
+    Infer an OMP user ID from a person's name.
+
+    This follows `OMP::User->infer_userid`: the ID is the family name
+    (the last word, or the part before a comma) followed by the first
+    initial, in upper case, with accents and punctuation removed.
+
+    Returns `None` if no ID can be inferred.
+    """
+
+    name = strip_accents(name).strip()
+
+    if ',' in name:
+        (family, given) = name.split(',', 1)
+        family_words = family.split()
+        given_words = given.split()
+    else:
+        words = name.split()
+        family_words = words[-1:]
+        given_words = words[:-1]
+
+    family = id_invalid.sub('', ''.join(family_words).upper())
+    if not family:
+        return None
+
+    initial = ''
+    for word in given_words:
+        word = id_invalid.sub('', word.upper())
+        if word:
+            initial = word[0]
+            break
+
+    return family + initial
+
+
+def get_trigrams(text):
+    """
+    Get the set of trigrams of a normalized name, with each word padded
+    by spaces so that the start and end of words are represented.
+    """
+
+    trigrams = set()
+
+    for word in text.split():
+        word = ' ' + word + ' '
+        for i in range(len(word) - 2):
+            trigrams.add(word[i:i + 3])
+
+    return trigrams
+
+
+class OMPUserIndex(object):
+    """
+    Index of OMP users for finding users matching a person's name.
+
+    A sorted list of user IDs allows users with IDs starting with the
+    inferred ID to be found by bisection, and a dictionary of users by
+    trigram (of the normalized user name) allows users with similar
+    names to be found without comparing every user.  A dictionary
+    of users by normalized name allows exact name matches to be found.
+    """
+
+    def __init__(self, users):
+        unique = {}
+        for user in users:
+            unique[user.id] = user
+
+        self.users = [unique[x] for x in sorted(unique.keys())]
+        self.ids = [x.id for x in self.users]
+
+        self.names = defaultdict(list)
+        self.trigrams = defaultdict(list)
+        self.n_trigram = []
+
+        for (i, user) in enumerate(self.users):
+            name = normalize_name(user.name or '')
+            if name:
+                self.names[name].append(i)
+
+            trigrams = get_trigrams(name)
+            self.n_trigram.append(len(trigrams))
+
+            for trigram in trigrams:
+                self.trigrams[trigram].append(i)
+
+    def __len__(self):
+        return len(self.users)
+
+    def search_prefix(self, prefix):
+        """
+        Get the indices of users whose ID starts with the given prefix.
+        """
+
+        start = bisect_left(self.ids, prefix)
+        end = start
+
+        while end < len(self.ids) and self.ids[end].startswith(prefix):
+            end += 1
+
+        return range(start, end)
+
+    def search_exact(self, name, omp_id):
+        """
+        Get the indices of users whose ID is exactly the given ID,
+        or whose normalized name is exactly that of the given name.
+        """
+
+        exact = set(self.names.get(normalize_name(name), ()))
+
+        if omp_id is not None:
+            i = bisect_left(self.ids, omp_id)
+            if i < len(self.ids) and self.ids[i] == omp_id:
+                exact.add(i)
+
+        return exact
+
+    def search_name(self, name):
+        """
+        Compute the similarity of a name to the names of the users
+        with which it has any trigram in common.
+
+        The similarity is the Dice coefficient of the sets of trigrams.
+
+        Returns a dictionary of similarity by user index.
+        """
+
+        trigrams = get_trigrams(normalize_name(name))
+        if not trigrams:
+            return {}
+
+        shared = defaultdict(int)
+        for trigram in trigrams:
+            for i in self.trigrams.get(trigram, ()):
+                shared[i] += 1
+
+        return {
+            i: 2 * n / (len(trigrams) + self.n_trigram[i])
+            for (i, n) in shared.items()}
+
+    def search(self, name, limit=10):
+        """
+        Find OMP users who may match the given name.
+
+        Users whose ID is exactly the inferred ID, or whose name
+        matches exactly, are ranked first (with a score of 1).  These
+        are followed by users whose ID starts with the inferred ID and then
+        other users with similar names.  Within each group users are
+        ranked by name similarity.
+
+        Returns a tuple of the inferred ID and a list of `OMPUserMatch`
+        tuples.
+        """
+
+        omp_id_inferred = infer_omp_id(name)
+
+        similarity = self.search_name(name)
+
+        exact = self.search_exact(name, omp_id_inferred)
+        for x in exact:
+            similarity[x] = 1.0
+
+        prefix = set()
+        if omp_id_inferred is not None:
+            prefix.update(self.search_prefix(omp_id_inferred))
+
+        ranked = sorted(
+            (x for x in set(similarity.keys()) | prefix
+             if x in prefix or similarity[x] >= min_similarity),
+            key=lambda x: (x not in exact, x not in prefix,
+                           -similarity.get(x, 0.0), self.ids[x]))
+
+        if limit is not None:
+            ranked = ranked[:limit]
+
+        return (omp_id_inferred, [
+            OMPUserMatch(
+                self.users[x], similarity.get(x, 0.0),
+                ('exact' if x in exact else
+                 ('id' if x in prefix else 'name')))
+            for x in ranked])
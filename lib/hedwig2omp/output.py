@@ -0,0 +1,170 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from codecs import open as open_
+from binascii import hexlify
+from collections import namedtuple
+import errno
+from multiprocessing.pool import ThreadPool
+import os
+import sys
+from time import time
+
+from hedwig.util import get_logger
+
+logger = get_logger(__name__)
+
+OutputFile = namedtuple(
+    'OutputFile', ('name', 'filename', 'mode', 'encoding', 'writer'))
+
+
+class OutputSet(object):
+    """
+    Set of output files to be written together.
+
+    Each file is written by calling its `writer` function with an open
+    file handle.  The writers run concurrently, each writing to a
+    temporary file in the same directory as its output file.  Only when
+    all of the writers have succeeded are the temporary files renamed
+    into place, so that either the whole set of files is updated or
+    none of them are.
+
+    Files are written with the given encoding, or if the encoding is
+    `None`, opened without one (e.g. for binary files).
+
+    A file name of "-" indicates standard output.  Such outputs can not
+    be held back, so they are written in turn (after the other writers
+    have succeeded) before the files are renamed.
+    """
+
+    def __init__(self, threads=None, profiler=None):
+        self.threads = threads
+        self.profiler = profiler
+        self.files = []
+
+    def add(self, name, filename, writer, mode='w', encoding='utf-8'):
+        self.files.append(OutputFile(name, filename, mode, encoding, writer))
+
+    def write(self):
+        """
+        Write all of the files.
+
+        If any writer raises an exception, the temporary files are
+        removed and the exception is re-raised.
+        """
+
+        to_file = [x for x in self.files if x.filename != '-']
+        to_stdout = [x for x in self.files if x.filename == '-']
+
+        temporary = []
+
+        try:
+            for output in to_file:
+                temporary.append(_create_temporary(output.filename))
+
+            threads = self.threads
+            if threads is None:
+                threads = len(to_file)
+
+            if threads <= 1 or len(to_file) <= 1:
+                for (output, tmp_filename) in zip(to_file, temporary):
+                    self._write_file(output, tmp_filename)
+
+            else:
+                pool = ThreadPool(min(threads, len(to_file)))
+
+                try:
+                    pending = [
+                        pool.apply_async(
+                            self._write_file, (output, tmp_filename))
+                        for (output, tmp_filename) in zip(to_file, temporary)]
+
+                    for result in pending:
+                        result.get()
+
+                finally:
+                    pool.terminate()
+                    pool.join()
+
+            for output in to_stdout:
+                self._write_file(output, None)
+
+        except:
+            for tmp_filename in temporary:
+                if os.path.exists(tmp_filename):
+                    os.unlink(tmp_filename)
+            raise
+
+        for (output, tmp_filename) in zip(to_file, temporary):
+            os.rename(tmp_filename, output.filename)
+
+    def _write_file(self, output, tmp_filename):
+        logger.debug('Writing {} file', output.name)
+
+        time_start = time()
+
+        if tmp_filename is None:
+            output.writer(sys.stdout)
+
+        elif output.encoding is None:
+            with open(tmp_filename, output.mode) as file_:
+                output.writer(file_)
+
+        else:
+            with open_(
+                    tmp_filename, output.mode,
+                    encoding=output.encoding) as file_:
+                output.writer(file_)
+
+        if self.profiler is not None:
+            self.profiler.record_phase(
+                'write:{}'.format(output.name), time() - time_start)
+
+
+def _create_temporary(filename):
+    """
+    Create a new, empty, temporary file in the same directory as the
+    given file.
+
+    The file is created with the permissions which would be given to a new
+    file (subject to the umask), rather than the restricted permissions
+    given by `tempfile.mkstemp`.
+
+    Returns the name of the temporary file.
+    """
+
+    (dir_, basename) = os.path.split(os.path.abspath(filename))
+
+    while True:
+        tmp_filename = os.path.join(dir_, '.{}.{}'.format(
+            basename, hexlify(os.urandom(4)).decode('ascii')))
+
+        try:
+            fd = os.open(
+                tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                continue
+            raise
+
+        os.close(fd)
+
+        return tmp_filename
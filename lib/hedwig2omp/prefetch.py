@@ -0,0 +1,168 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict, namedtuple
+from multiprocessing.pool import ThreadPool
+
+from hedwig.type.enum import ProposalType
+from hedwig.util import get_logger
+
+logger = get_logger(__name__)
+
+PrefetchedData = namedtuple('PrefetchedData', [
+    'jcmt_allocations', 'jcmt_alloc_options', 'jcmt_request_options',
+    'jcmt_requests', 'targets', 'prev_proposals',
+    'continuations_prev', 'continued_proposals'])
+
+
+def prefetch_proposal_data(
+        db, facility, facility_id, telescope, plan, proposal_collection,
+        threads=None):
+    """
+    Fetch the information, beyond that given by `search_proposal`, needed
+    to process a collection of proposals.
+
+    The searches required by the given `QueryPlan` are independent of
+    each other, so they are run concurrently using a pool of threads.
+    Each search is performed in its own database transaction, and hence
+    on its own connection from the database engine's pool.  The number of
+    threads defaults to the number of searches, and with `threads` set to
+    1 the searches are run one after another.
+
+    Review extra information is attached to the proposals in the
+    collection, if planned.
+
+    Returns a `PrefetchedData` namedtuple, in which the result sets which
+    were not required are `None`.  Exceptions raised by any of the
+    searches are re-raised.
+    """
+
+    proposal_ids = [x.id for x in proposal_collection.values()]
+    proposal_ids_cr = [
+        x.id for x in proposal_collection.values()
+        if x.type == ProposalType.CONTINUATION]
+
+    by_proposal = {'proposal_id': proposal_ids}
+
+    tasks = OrderedDict()
+
+    if plan.review_extra:
+        tasks['review_extra'] = (
+            facility.attach_review_extra, (db, proposal_collection), {})
+
+    if telescope == 'JCMT':
+        if plan.jcmt_allocations:
+            tasks['jcmt_allocations'] = (
+                db.search_jcmt_allocation, (), by_proposal)
+            tasks['jcmt_alloc_options'] = (
+                db.search_jcmt_alloc_options, (), by_proposal)
+        if plan.jcmt_options:
+            tasks['jcmt_request_options'] = (
+                db.search_jcmt_options, (), by_proposal)
+        if plan.jcmt_requests:
+            tasks['jcmt_requests'] = (
+                db.search_jcmt_request, (), by_proposal)
+
+    if plan.targets:
+        tasks['targets'] = (db.search_target, (), by_proposal)
+
+    if plan.prev_proposals:
+        tasks['prev_proposals'] = (db.search_prev_proposal, (), by_proposal)
+
+    if proposal_ids_cr:
+        tasks['continuations'] = (
+            _fetch_continuations,
+            (db, facility, facility_id, proposal_ids_cr), {})
+
+    if threads is None:
+        threads = len(tasks)
+
+    results = {}
+
+    if threads <= 1 or len(tasks) <= 1:
+        for (name, (function, args, kwargs)) in tasks.items():
+            results[name] = function(*args, **kwargs)
+
+    else:
+        logger.debug(
+            'Running {} prefetch searches using {} threads',
+            len(tasks), min(threads, len(tasks)))
+
+        pool = ThreadPool(min(threads, len(tasks)))
+
+        try:
+            pending = [
+                (name, pool.apply_async(function, args, kwargs))
+                for (name, (function, args, kwargs)) in tasks.items()]
+
+            for (name, result) in pending:
+                results[name] = result.get()
+
+        finally:
+            pool.terminate()
+            pool.join()
+
+    (continuations_prev, continued_proposals) = results.get(
+        'continuations', (None, {}))
+
+    return PrefetchedData(
+        jcmt_allocations=results.get('jcmt_allocations'),
+        jcmt_alloc_options=results.get('jcmt_alloc_options'),
+        jcmt_request_options=results.get('jcmt_request_options'),
+        jcmt_requests=results.get('jcmt_requests'),
+        targets=results.get('targets'),
+        prev_proposals=results.get('prev_proposals'),
+        continuations_prev=continuations_prev,
+        continued_proposals=continued_proposals)
+
+
+def _fetch_continuations(db, facility, facility_id, proposal_ids):
+    """
+    Find the proposals continued by the given continuation requests.
+
+    Returns a tuple of the previous proposal collection (of continuation
+    references) and a dictionary of continued proposal and its code by
+    proposal ID.
+    """
+
+    continuations_prev = db.search_prev_proposal(
+        proposal_id=proposal_ids,
+        continuation=True, resolved=True,
+        with_publications=False)
+    n_query = 1
+
+    continued_proposals = {}
+    continued_proposal_ids = set(
+        x.proposal_id for x in continuations_prev.values())
+    if continued_proposal_ids:
+        for continued_proposal in db.search_proposal(
+                facility_id=facility_id,
+                proposal_id=list(continued_proposal_ids)).values():
+            continued_proposals[continued_proposal.id] = (
+                continued_proposal,
+                facility.make_proposal_code(db, continued_proposal))
+        n_query += 1
+
+    logger.debug(
+        'Fetched {} continued proposal(s) for {} continuation request(s)'
+        ' using {} queries', len(continued_proposals),
+        len(proposal_ids), n_query)
+
+    return (continuations_prev, continued_proposals)
@@ -0,0 +1,921 @@
+# Copyright (C) 2015-2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+import io
+import json
+import os
+import sys
+
+from hedwig.compat import str_to_unicode
+from hedwig.error import NoSuchValue
+from hedwig.util import get_logger
+from hedwig.type.collection import ProposalCollection
+from hedwig.type.enum import Assessment, FormatType, \
+    ProposalState, ProposalType, ReviewState
+from hedwig.type.util import null_tuple
+
+from hedwig.facility.jcmt.type import \
+    JCMTInstrument, JCMTRequestCollection, JCMTRequest, \
+    JCMTReviewerExpertise, JCMTWeather
+
+from hedwig2omp.instrument import Profiler
+from hedwig2omp.incremental import \
+    ExportManifest, OutputSlices, args_context, proposal_inputs
+from hedwig2omp.output import OutputSet
+from hedwig2omp.prefetch import prefetch_proposal_data
+from hedwig2omp.type import Project
+
+logger = get_logger(__name__)
+
+TextFormat = namedtuple('TextFormat', ['text', 'format'])
+
+# Formats supported by `JSONFragmentSpool`.  (The JSON writer module is
+# only imported if JSON output is requested.)
+json_formats = ('indent', 'compact', 'lines')
+
+QueryPlan = namedtuple('QueryPlan', [
+    'members', 'reviewers', 'review_info', 'review_text', 'review_extra',
+    'decision', 'decision_note', 'categories', 'affiliations',
+    'jcmt_allocations', 'jcmt_options', 'jcmt_requests',
+    'targets', 'prev_proposals'])
+
+
+def export_proj_def(args, db, facility_info, users, config, profiler=None):
+    """
+    Export project definitions, and the related output files, for the
+    proposals selected by the given `make_proj_def` command line arguments.
+
+    `users` should be a dictionary of OMP user IDs by Hedwig person ID,
+    or a function returning such a dictionary, which is called once the
+    proposals have been selected.  (This allows the users to be read
+    while the selection query runs.)
+    """
+
+    if profiler is None:
+        profiler = Profiler(enabled=False)
+
+    telescope = args['--facility']
+    facility = profiler.wrap(facility_info.view, 'facility')
+
+    with_json = (args['--output-json'] is not None)
+    with_columnar = (args['--output-columnar'] is not None)
+    with_details = (with_json or with_columnar)
+
+    if args['--json-format'] not in json_formats:
+        logger.error('JSON format "{}" not recognised', args['--json-format'])
+        sys.exit(1)
+
+    if args['--diff-against'] is None:
+        if args['--output-changed'] is not None:
+            logger.error('Option --output-changed requires --diff-against')
+            sys.exit(1)
+
+    elif args['--output'] == '-':
+        logger.error('Can not write project definitions and differences '
+                     'to standard output')
+        sys.exit(1)
+
+    plan = plan_queries(args)
+    logger.debug('Query plan: {}', ', '.join(
+        name for (name, value) in plan._asdict().items() if value))
+
+    query_kwargs = {
+        'facility_id': facility_info.id,
+        'decision_accept': (True if args['--decision-accept'] else None),
+        'with_members': plan.members,
+        'with_reviewers': plan.reviewers,
+        'with_review_info': plan.review_info,
+        'with_review_text': plan.review_text,
+        'with_review_state': (ReviewState.DONE if plan.reviewers else None),
+        'with_decision': plan.decision,
+        'with_decision_note': plan.decision_note,
+        'with_categories': plan.categories,
+    }
+
+    # When processing in batches, initially select the proposals without
+    # any additional information, which is then fetched for each batch.
+    chunk_size = None
+    selection_kwargs = query_kwargs
+    if args['--chunk-size'] is not None:
+        chunk_size = int(args['--chunk-size'])
+        if chunk_size < 1:
+            logger.error('Chunk size must be positive')
+            sys.exit(1)
+
+        selection_kwargs = {
+            'facility_id': facility_info.id,
+            'decision_accept': query_kwargs['decision_accept'],
+        }
+
+    prefetch_threads = None
+    if args['--prefetch-threads'] is not None:
+        prefetch_threads = int(args['--prefetch-threads'])
+        if prefetch_threads < 1:
+            logger.error('Number of prefetch threads must be positive')
+            sys.exit(1)
+
+    type_class = facility.get_call_types()
+
+    profiler.start_phase('select')
+
+    if args['--project'] == []:
+        if args['--state'].lower() == 'any':
+            # Assume "any" means any submitted state.
+            state = ProposalState.submitted_states()
+        else:
+            state = ProposalState.by_name(args['--state'])
+            if state is None:
+                logger.error('State "{}" not recognised', args['--state'])
+                sys.exit(1)
+
+        try:
+            call_type = type_class.by_code(
+                None if args['--type'] == 'NONE' else args['--type'])
+        except NoSuchValue:
+            logger.error('Type "{}" not recognised', args['--type'])
+            sys.exit(1)
+
+        semester_code = str_to_unicode(args['--semester'])
+        queue_code = str_to_unicode(args['--queue'])
+
+        logger.debug('Finding proposals for this call')
+        proposal_collection = db.search_proposal(
+            call_type=call_type,
+            semester_code=semester_code,
+            queue_code=queue_code,
+            state=state,
+            **selection_kwargs)
+
+    else:
+        logger.debug('Searching for specific proposal by identifier')
+
+        proposal_ids = []
+        for project_code in args['--project']:
+            proposal_ids.append(facility.parse_proposal_code(
+                db, str_to_unicode(project_code)))
+
+        proposal_collection = db.search_proposal(
+            proposal_id=proposal_ids,
+            **selection_kwargs)
+
+        semester_code = None
+        for proposal in proposal_collection.values():
+            if semester_code is None:
+                semester_code = proposal.semester_code
+                queue_code = proposal.queue_code
+                call_type = proposal.call_type
+            else:
+                if not (
+                        (semester_code == proposal.semester_code)
+                        and (queue_code == proposal.queue_code)
+                        and (call_type == proposal.call_type)):
+                    logger.error('Specified projects have inconsistent semster, queue or call type')
+                    sys.exit(1)
+
+    if callable(users):
+        users = users()
+
+    profiler.end_phase()
+
+    # Override the semester name if we are processing test proposals.
+    if call_type == type_class.TEST:
+        semester_code = 'TEST'
+
+    # Determine the expiry date for projects from multiple-close calls.
+    # This is computed once so that it is the same for all projects,
+    # and can be included in the context of an incremental export.
+    expiry = None
+    if (call_type == type_class.MULTICLOSE):
+        dt_now = datetime.utcnow()
+        expiry_year = dt_now.year
+        expiry_month = dt_now.month + 7
+        if expiry_month > 12:
+            expiry_month -= 12
+            expiry_year += 1
+        expiry = datetime(expiry_year, expiry_month, 2)
+
+    logger.debug('Determining OMP country code')
+    country = config.get_queue_country(queue_code)
+    if country is None:
+        logger.warning('Could not find country, using "{}"', queue_code)
+        country = queue_code
+
+    proposals = []
+    json_spool = None
+    if with_json:
+        from hedwig2omp.project_list_json import JSONFragmentSpool
+        json_spool = JSONFragmentSpool(args['--json-format'])
+    column_tables = None
+    if with_columnar:
+        from hedwig2omp.columnar import ColumnarTables
+        column_tables = ColumnarTables()
+    continuation_proposals = []
+    n_err = 0
+    call_id = None
+    queue_id = None
+    affiliations = None
+    affiliation_codes = {}
+    affiliation_names = {}
+    assignments = OrderedDict()
+    targets = OrderedDict()
+    notes = OrderedDict()
+    feedback = OrderedDict()
+    prev_proposals = OrderedDict()
+    role_class = facility.get_reviewer_roles()
+
+    manifest = None
+    output_slices = None
+    if args['--incremental'] is not None:
+        manifest = ExportManifest(args['--incremental'])
+        output_slices = OutputSlices(proposals, continuation_proposals)
+
+    # Names of the output entries stored in the manifest cache, with the
+    # dictionary in which each is collected.
+    entry_dicts = (
+        ('assignment', assignments),
+        ('targets', targets),
+        ('notes', notes),
+        ('feedback', feedback),
+        ('prev_proposals', prev_proposals),
+    )
+
+    profiler.start_phase('process')
+
+    for proposal_collection in iter_proposal_chunks(
+            db, proposal_collection, chunk_size, query_kwargs):
+        proposal_details = {}
+
+        profiler.start_phase('prefetch')
+
+        prefetched = prefetch_proposal_data(
+            db, facility, facility_info.id, telescope, plan,
+            proposal_collection, threads=prefetch_threads)
+
+        if plan.members:
+            for proposal in proposal_collection.values():
+                to_delete = []
+                for member in proposal.members.values():
+                    if member.affiliation_name == 'Invalid':
+                        logger.warning('Skipping "invalid" affiliation person {} ({})',
+                                       member.person_id, member.person_name)
+                        to_delete.append(member.id)
+                for member_id in to_delete:
+                    del proposal.members[member_id]
+
+        profiler.end_phase()
+
+        fragments = {}
+        column_rows = {}
+
+        for proposal in proposal_collection.values():
+            if output_slices is not None:
+                output_slices.stop()
+
+            code = facility.make_proposal_code(db, proposal)
+
+            if plan.affiliations:
+                # Fetch affiliation information from the database if we don't have
+                # it already.
+                if affiliations is None:
+                    call_id = proposal.call_id
+                    queue_id = proposal.queue_id
+                    affiliations = db.search_affiliation(
+                        queue_id=queue_id, hidden=False,
+                        with_weight_call_id=call_id)
+
+                    # Make lookup table for the JSON output.
+                    affiliation_names[0] = 'Unknown'
+                    for affiliation in affiliations.values():
+                        affiliation_names[affiliation.id] = affiliation.name
+
+                    # Make lookup table for the affiliations and project files.
+                    # Report unrecognised affiliations before processing
+                    # any proposals.  (It is only an error if a member
+                    # has such an affiliation.)
+                    (known_codes, unknown_affiliations) = \
+                        config.map_affiliation_codes(affiliations)
+
+                    for affiliation in unknown_affiliations:
+                        logger.warning(
+                            'Affiliation not in configuration: {} {}',
+                            affiliation.id, affiliation.name)
+
+                    affiliation_codes[0] = 'zz'
+                    affiliation_codes.update(known_codes)
+
+                elif ((call_id != proposal.call_id) or
+                        (queue_id != proposal.queue_id)):
+                    logger.error('Call or queue mismatch')
+                    sys.exit(1)
+
+            if manifest is not None:
+                if manifest.context is None:
+                    manifest.set_context(
+                        args_context(args), semester_code, country, expiry,
+                        [(x, config.get_affiliation_name(x))
+                         for x in config.affiliation_codes],
+                        affiliations)
+
+                # Reuse the previous output entries if the inputs for this
+                # proposal have not changed.
+                entry = manifest.lookup(
+                    code, proposal_inputs(proposal, prefetched, users))
+
+                if entry is not None:
+                    proposals.extend(entry['project'])
+                    continuation_proposals.extend(entry['continuation'])
+                    for (name, dict_) in entry_dicts:
+                        if name in entry:
+                            dict_[code] = entry[name]
+                    if 'json' in entry:
+                        json_spool.add_fragment(code, entry['json'])
+                    if 'columnar' in entry:
+                        column_tables.add_rows(code, entry['columnar'])
+                    continue
+
+                output_slices.start(code)
+
+            continuation_proposal = None
+            continuation_code = None
+            if proposal.type == ProposalType.STANDARD:
+                pass
+
+            elif proposal.type == ProposalType.CONTINUATION:
+                try:
+                    continuation_prev = prefetched.continuations_prev.subset_by_this_proposal(
+                        proposal.id).get_single()
+                    (continuation_proposal, continuation_code) = \
+                        prefetched.continued_proposals[continuation_prev.proposal_id]
+                except:
+                    logger.error('Could not find continuation for proposal {}', code)
+                    n_err += 1
+                    continue
+
+            else:
+                logger.error('Unknown type for proposal {}', code)
+                n_err += 1
+                continue
+
+            if with_details:
+                # Add proposal details to the list.
+                proposal_detail = proposal._asdict()
+                proposal_details[code] = proposal_detail
+
+                # Replace some enum values with names.
+                proposal_detail['state'] = ProposalState.get_name(proposal.state)
+                proposal_detail['type'] = ProposalType.get_name(proposal.type)
+                proposal_detail['call_type'] = type_class.get_name(proposal.call_type)
+
+            if plan.affiliations:
+                # Compute affiliation fractions.
+                proposal_assignment = facility.calculate_affiliation_assignment(
+                    db, proposal.members, affiliations)
+
+                if continuation_proposal is None:
+                    if (args['--include-exempt-affiliations']
+                            or not proposal.decision_exempt):
+                        assignments[code] = proposal_assignment
+
+                if with_details:
+                    proposal_detail['affiliation_assignment'] = {
+                        affiliation_names.get(k, 'Bad value'): v
+                        for (k, v) in proposal_assignment.items()}
+
+            # Process member list.
+            pi = None
+            pi_affiliation = None
+            cois = []
+            coi_affiliation = []
+            member_pi = None
+            member_cois = []
+
+            if ((args['--output'] is not None)
+                    or ((args['--output-continuation'] is not None))
+                    or (args['--diff-against'] is not None)
+                    or with_details):
+                for member in proposal.members.values():
+                    # Record actual member objects for JSON output.
+                    is_pi = member.pi and (member_pi is None)
+
+                    if is_pi:
+                        member_pi = member
+                    else:
+                        member_cois.append(member)
+
+                    # Attempt to get OMP ID for OMP project file output.
+                    omp_id = users.get(member.person_id)
+                    if omp_id is None:
+                        if args['--skip-unknown-cois']:
+                            logger.warning('Unknown Hedwig user {} ({})',
+                                           member.person_id, member.person_name)
+                        else:
+                            logger.error('Unknown Hedwig user {} ({})',
+                                         member.person_id, member.person_name)
+                            n_err += 1
+                        continue
+
+                    affiliation_code = affiliation_codes.get(member.affiliation_id)
+                    if affiliation_code is None:
+                        logger.error('Unknown affiliation: {} {}', member.affiliation_id, member.affiliation_name)
+                        n_err += 1
+                        continue
+
+                    if is_pi:
+                        pi = omp_id
+                        pi_affiliation = affiliation_code
+                    else:
+                        cois.append(omp_id)
+                        coi_affiliation.append(affiliation_code)
+
+                if member_pi is None:
+                    logger.error('No PI for project {}', code)
+                    n_err += 1
+                    continue
+                if pi is None:
+                    if args['--skip-unknown-pis']:
+                        pi = ''
+                        pi_affiliation = ''
+                    else:
+                        logger.error('PI is unknown Hedwig user (user: {})', member_pi.person_id)
+                        n_err += 1
+                        continue
+
+                # Fetch allocation.
+                if telescope == 'JCMT':
+                    allocation = prefetched.jcmt_allocations.subset_by_proposal(proposal.id)
+                    if not allocation:
+                        if ((args['--output'] is not None)
+                                or (args['--output-continuation'] is not None)
+                                or (args['--diff-against'] is not None)
+                                or (proposal.state == ProposalState.ACCEPTED)):
+                            if args['--request-allocation']:
+                                allocation = prefetched.jcmt_requests.subset_by_proposal(proposal.id)
+                                if allocation:
+                                    logger.warning('Using request as allocation for project {}', code)
+                                else:
+                                    logger.error('No allocation or request for project {}', code)
+                                    n_err += 1
+                            elif args['--dummy-allocation']:
+                                logger.warning('Using dummy allocation for project {}', code)
+                                allocation = JCMTRequestCollection(((
+                                    1, null_tuple(JCMTRequest)._replace(
+                                        weather=JCMTWeather.BAND5,
+                                        instrument=JCMTInstrument.SCUBA2,
+                                        time=1)),))
+                            else:
+                                logger.error('No allocation for project {}', code)
+                                n_err += 1
+                        else:
+                            logger.warning('No allocation for project {}', code)
+                    allocation_total = allocation.get_total()
+                    bands = [
+                        x for x in range(1, 6)
+                        if allocation_total.weather.get(x, False)]
+
+                    options = prefetched.jcmt_alloc_options.subset_by_proposal(
+                        proposal.id).get_single(default=None)
+
+                else:
+                    allocation = None
+                    from collections import namedtuple
+                    DummyTotal = namedtuple('DummyTotal', ['total'])
+                    allocation_total = DummyTotal(total=0.0)
+                    bands = []
+                    options = None
+
+                (rating, rating_std_dev) = facility.calculate_overall_rating(
+                    proposal.reviewers, with_std_dev=True)
+
+                if ((options is not None) and options.target_of_opp):
+                    priority = -10
+                else:
+                    # Compute priority, using formula suggested by IMC:
+                    #     OMP priority = 300 - 4 * (TAC_rating - 50)
+                    priority = 600 if rating is None else int(500.0 - (4.0 * rating))
+
+                if continuation_proposal is None:
+                    proposals.append(null_tuple(Project)._replace(
+                        code=code,
+                        country=country,
+                        pi=pi,
+                        pi_affiliation=pi_affiliation,
+                        cois=cois,
+                        coi_affiliation=coi_affiliation,
+                        title=proposal.title,
+                        bands=bands,
+                        allocation=allocation_total.total,
+                        tagpriority=priority,
+                        tagadjustment=None,
+                        support='',
+                        expiry=expiry,
+                    ))
+
+                else:
+                    continuation_proposals.append(null_tuple(Project)._replace(
+                        code=continuation_code,
+                        continuation=code,
+                        pi=pi,
+                        pi_affiliation=pi_affiliation,
+                        cois=cois,
+                        coi_affiliation=coi_affiliation,
+                        bands=bands,
+                        allocation=allocation_total.total,
+                        tagpriority=priority,
+                    ))
+
+                if with_details:
+                    del proposal_detail['member']
+                    del proposal_detail['members']
+                    del proposal_detail['reviewer']
+                    del proposal_detail['reviewers']
+
+                    proposal_detail['omp_pi'] = pi
+                    proposal_detail['omp_cois'] = cois
+                    proposal_detail['omp_bands'] = bands
+                    proposal_detail['omp_priority'] = priority
+                    proposal_detail['rating'] = rating
+                    proposal_detail['rating_std_dev'] = rating_std_dev
+                    proposal_detail['allocation'] = allocation
+                    proposal_detail['member_pi'] = member_pi
+                    proposal_detail['member_cois'] = member_cois
+                    if telescope == 'JCMT':
+                        proposal_detail['request'] = \
+                            prefetched.jcmt_requests.subset_by_proposal(proposal.id)
+                        proposal_detail['jcmt_options_request'] = \
+                            prefetched.jcmt_request_options.subset_by_proposal(
+                                proposal.id).get_single(default=None)
+                        proposal_detail['jcmt_options'] = \
+                            prefetched.jcmt_alloc_options.subset_by_proposal(
+                                proposal.id).get_single(default=None)
+
+                    roles = (
+                        role_class.get_options()
+                        if args['--all-reviews']
+                        else {role_class.TECH: 'Technical'})
+
+                    for (role, role_name) in roles.items():
+                        role_name = role_name.lower().replace(' ', '_')
+
+                        reviews = []
+                        for review in proposal.reviewers.values_by_role(role):
+                            extra = review.review_extra
+
+                            if review.review_assessment is not None:
+                                review = review._replace(
+                                    review_assessment=Assessment.get_name(
+                                        review.review_assessment))
+
+                            if extra is not None:
+                                if extra.expertise is not None:
+                                    extra = extra._replace(
+                                        expertise=JCMTReviewerExpertise.get_name(extra.expertise))
+
+                            reviews.append(review._replace(
+                                role=role_class.get_name(review.role),
+                                review_state=ReviewState.get_name(review.review_state),
+                                review_extra=extra))
+
+                        if role_class.get_info(role).unique:
+                            proposal_detail['review_{}'.format(role_name)] = (
+                                None if (len(reviews) != 1) else
+                                reviews[0])
+                        else:
+                            proposal_detail['review_{}'.format(role_name)] = reviews
+
+            if continuation_proposal is None:
+                if plan.targets:
+                    # Fetch target information from the database.
+                    proposal_targets = prefetched.targets.subset_by_proposal(proposal.id)
+                    targets[code] = proposal_targets
+
+                    if with_details:
+                        proposal_detail['targets'] = proposal_targets
+
+            if (args['--output-notes'] is not None) and proposal.decision_note:
+                notes[code] = {
+                    'note': TextFormat(
+                        text=proposal.decision_note,
+                        format=proposal.decision_note_format),
+                    'continuation': continuation_code,
+                }
+
+            if (args['--output-feedback'] is not None):
+                feedback_reviews = proposal.reviewers.values_by_role(
+                    role_class.FEEDBACK)
+                if feedback_reviews:
+                    feedback[code] = {
+                        'note': (
+                            TextFormat(
+                                text=feedback_reviews[0].review_text,
+                                format=feedback_reviews[0].review_format)
+                            if len(feedback_reviews) == 1 else
+                            TextFormat(
+                                text='Multiple feedback messages: please view online.',
+                                format=FormatType.PLAIN)),
+                        'continuation': continuation_code,
+                    }
+
+            if (args['--output-publications'] is not None) or with_json:
+                proposal_prev_proposals = \
+                    prefetched.prev_proposals.subset_by_this_proposal(proposal.id)
+                prev_proposals[code] = proposal_prev_proposals
+
+                if with_json:
+                    proposal_detail['prev_proposals'] = proposal_prev_proposals
+
+        # Encode the JSON details (and columnar rows) for this batch of
+        # proposals so that the proposal objects can be released.
+        for (code, proposal_detail) in proposal_details.items():
+            if with_json:
+                fragments[code] = json_spool.add(code, proposal_detail)
+
+            if with_columnar:
+                column_rows[code] = column_tables.add(code, proposal_detail)
+
+        del proposal_details
+
+        # Store the output entries for the proposals processed in this batch.
+        if manifest is not None:
+            for (code, (project, continuation)) in \
+                    output_slices.pop_slices().items():
+                entry = {
+                    'project': project,
+                    'continuation': continuation,
+                }
+                for (name, dict_) in entry_dicts:
+                    if code in dict_:
+                        entry[name] = dict_[code]
+                if code in fragments:
+                    entry['json'] = fragments[code]
+                if code in column_rows:
+                    entry['columnar'] = column_rows[code]
+
+                manifest.record(code, entry)
+
+    profiler.end_phase()
+
+    if n_err:
+        logger.info('Aborting due to {} error(s)', n_err)
+        sys.exit(1)
+
+    # Write the output files together, so that either all of them are
+    # updated or (if any writer fails) none are.
+    outputs = OutputSet(profiler=profiler)
+
+    # Each writer module is imported only if its output is requested.
+    if ((args['--output'] is not None) or
+            (args['--output-continuation'] is not None) or
+            (args['--output-changed'] is not None)):
+        from hedwig2omp.project_ini import write_project_ini
+
+    if ((args['--output-notes'] is not None) or
+            (args['--output-feedback'] is not None)):
+        from hedwig2omp.notes_file import write_notes_file
+
+    if args['--output'] is not None:
+        if not proposals:
+            logger.debug('No project definitions to write')
+        else:
+            outputs.add(
+                'project', args['--output'],
+                lambda f: write_project_ini(
+                    f, telescope, semester_code, proposals),
+                mode='wb')
+
+    if args['--diff-against'] is not None:
+        from hedwig2omp.project_ini import \
+            diff_projects, read_project_ini, write_project_diff
+
+        with io.open(args['--diff-against'], 'r', encoding='utf-8') as f:
+            (old_info, old_projects) = read_project_ini(f)
+
+        if old_info.get('semester', semester_code) != semester_code:
+            logger.warning(
+                'Comparing with project definitions for semester {}',
+                old_info['semester'])
+
+        project_diff = diff_projects(
+            old_projects, OrderedDict((x.code, x) for x in proposals))
+
+        logger.info(
+            'Project definitions added: {}, changed: {}, removed: {}',
+            len(project_diff['added']), len(project_diff['changed']),
+            len(project_diff['removed']))
+
+        outputs.add(
+            'project diff', '-',
+            lambda f: write_project_diff(f, project_diff))
+
+        if args['--output-changed'] is not None:
+            changed_codes = set(project_diff['added'])
+            changed_codes.update(project_diff['changed'].keys())
+
+            outputs.add(
+                'changed projects', args['--output-changed'],
+                lambda f: write_project_ini(
+                    f, telescope, semester_code,
+                    (x for x in proposals if x.code in changed_codes)),
+                mode='wb')
+
+    if args['--output-continuation'] is not None:
+        if not continuation_proposals:
+            logger.debug('No continuation requests to write')
+        else:
+            outputs.add(
+                'continuation', args['--output-continuation'],
+                lambda f: write_project_ini(
+                    f, telescope, semester_code, continuation_proposals),
+                mode='wb')
+
+    if args['--output-affiliations'] is not None:
+        from hedwig2omp.affiliation_file import write_affiliation_file
+
+        outputs.add(
+            'affiliations', args['--output-affiliations'],
+            lambda f: write_affiliation_file(f, affiliation_codes, assignments))
+
+    if args['--output-targets'] is not None:
+        from hedwig2omp.target_file import write_target_file
+
+        outputs.add(
+            'targets', args['--output-targets'],
+            lambda f: write_target_file(f, targets))
+
+    if ((args['--output-targets-icrs'] is not None) or
+            (args['--output-overlap'] is not None)):
+        from hedwig2omp.target_overlap import TargetTable, \
+            write_normalized_target_file, write_overlap_report
+
+        with profiler.phase('target_overlap'):
+            target_table = TargetTable(
+                targets, float(args['--target-tolerance']))
+
+    if args['--output-targets-icrs'] is not None:
+        outputs.add(
+            'targets (ICRS)', args['--output-targets-icrs'],
+            lambda f: write_normalized_target_file(f, target_table))
+
+    if args['--output-overlap'] is not None:
+        outputs.add(
+            'target overlap', args['--output-overlap'],
+            lambda f: write_overlap_report(f, target_table))
+
+    if args['--output-notes'] is not None:
+        outputs.add(
+            'notes', args['--output-notes'],
+            lambda f: write_notes_file(f, notes))
+
+    if args['--output-feedback'] is not None:
+        outputs.add(
+            'feedback', args['--output-feedback'],
+            lambda f: write_notes_file(f, feedback))
+
+    if args['--output-publications'] is not None:
+        from hedwig2omp.prev_prop_pub import write_prev_prop_pub
+
+        outputs.add(
+            'publications', args['--output-publications'],
+            lambda f: write_prev_prop_pub(f, prev_proposals))
+
+    if with_json:
+        outputs.add('json', args['--output-json'], json_spool.write)
+
+    if with_columnar:
+        from hedwig2omp.columnar import get_table_filename, write_column_table
+
+        with profiler.phase('columnar'):
+            column_arrays = column_tables.get_arrays()
+
+        if not os.path.isdir(args['--output-columnar']):
+            os.makedirs(args['--output-columnar'])
+
+        for (table, table_arrays) in column_arrays.items():
+            outputs.add(
+                'columnar {}'.format(table),
+                get_table_filename(args['--output-columnar'], table),
+                (lambda f, table_arrays=table_arrays:
+                    write_column_table(f, table_arrays)),
+                mode='wb', encoding=None)
+
+    changes = None
+    if manifest is not None:
+        changes = manifest.get_changes()
+        logger.info(
+            'Projects added: {}, changed: {}, removed: {}, unchanged: {}',
+            len(changes['added']), len(changes['changed']),
+            len(changes['removed']), changes['unchanged'])
+
+        if args['--change-report'] is not None:
+            outputs.add(
+                'change report', args['--change-report'],
+                lambda f: write_change_report(f, changes))
+
+    try:
+        outputs.write()
+
+    finally:
+        if with_json:
+            json_spool.close()
+
+    if manifest is not None:
+        logger.debug('Writing manifest')
+        manifest.save()
+
+
+def write_change_report(file_, changes):
+    """
+    Write a JSON file listing the added, changed and removed projects.
+    """
+
+    json.dump(changes, file_, indent=4, separators=(',', ': '))
+    print('', file=file_)
+
+
+def iter_proposal_chunks(db, proposal_collection, chunk_size, query_kwargs):
+    """
+    Iterate over batches of proposals.
+
+    If no chunk size is given, the given proposal collection is yielded
+    unchanged.  Otherwise the full information is fetched for each
+    batch of proposals in turn, keeping the original order.
+    """
+
+    if chunk_size is None:
+        yield proposal_collection
+        return
+
+    proposal_ids = [x.id for x in proposal_collection.values()]
+    del proposal_collection
+
+    for offset in range(0, len(proposal_ids), chunk_size):
+        chunk_ids = proposal_ids[offset:offset + chunk_size]
+        chunk = db.search_proposal(proposal_id=chunk_ids, **query_kwargs)
+
+        yield ProposalCollection(
+            (x, chunk[x]) for x in chunk_ids if x in chunk)
+
+        del chunk
+
+
+def plan_queries(args):
+    """
+    Determine which information must be fetched from the database
+    in order to prepare the requested outputs.
+
+    Returns a `QueryPlan` namedtuple of boolean values, covering both the
+    `with_*` options for `search_proposal` and the additional bulk searches.
+    """
+
+    with_project = ((args['--output'] is not None)
+                    or (args['--output-continuation'] is not None)
+                    or (args['--diff-against'] is not None))
+    with_affiliations = (args['--output-affiliations'] is not None)
+    with_notes = (args['--output-notes'] is not None)
+    with_feedback = (args['--output-feedback'] is not None)
+    with_json = (args['--output-json'] is not None)
+    with_details = with_json or (args['--output-columnar'] is not None)
+    with_targets = any(
+        (args[x] is not None) for x in (
+            '--output-targets', '--output-targets-icrs', '--output-overlap'))
+
+    # Project definitions need the ratings, which (for the JCMT) are
+    # weighted by the reviewer expertise from the review extra information.
+    with_rating = with_project or with_details
+
+    return QueryPlan(
+        members=(with_project or with_affiliations or with_details),
+        reviewers=(with_rating or with_feedback),
+        review_info=with_rating,
+        review_text=(with_feedback or with_json),
+        review_extra=with_rating,
+        decision=(with_affiliations or with_notes or with_details),
+        decision_note=(with_notes or with_json),
+        categories=with_json,
+        affiliations=(with_project or with_affiliations or with_details),
+        jcmt_allocations=(with_project or with_details),
+        jcmt_options=with_details,
+        jcmt_requests=(
+            with_details or (with_project and args['--request-allocation'])),
+        targets=(with_targets or with_details),
+        prev_proposals=(
+            (args['--output-publications'] is not None) or with_json),
+    )
@@ -1,4 +1,4 @@
-# Copyright (C) 2015-2024 East Asian Observatory
+# Copyright (C) 2015-2026 East Asian Observatory
 # All Rights Reserved.
 #
 # This program is free software; you can redistribute it and/or modify it under
@@ -18,10 +18,14 @@
 from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
-try:
-    from configparser import ConfigParser
-except:
-    from ConfigParser import SafeConfigParser as ConfigParser
+from collections import OrderedDict
+from datetime import datetime
+
+from hedwig.type.util import null_tuple
+
+from hedwig2omp.type import Project
+
+expiry_format = '%Y-%m-%dT%H:%M:%S'
 
 
 def write_project_ini(file_, telescope, semester, projects):
@@ -34,47 +38,253 @@ def write_project_ini(file_, telescope, semester, projects):
         with open('{}.ini'.format(semester), 'wb') as file_:
             write_project_ini(file, 'JCMT', semester, projects)
 
-    `projects` should be a list of `Project` namedtuples.
+    `projects` should be an iterable of `Project` namedtuples.
+    Each project is written as it is received, giving the same output
+    as `ConfigParser.write` would.
     """
 
-    config = ConfigParser()
-
-    config.add_section('info')
-    config.set('info', 'semester', semester)
-    config.set('info', 'telescope', telescope)
+    writer = ProjectIniWriter(file_, telescope, semester)
 
     for project in projects:
-        code = project.code
-        config.add_section(code)
-        if project.continuation is not None:
-            config.set(code, 'continuation', project.continuation)
+        writer.add(project)
+
+
+class ProjectIniWriter(object):
+    """
+    Writer for OMP project definition files, writing each project
+    section as it is added.
+    """
+
+    def __init__(self, file_, telescope, semester):
+        self.file_ = file_
+        self.codes = set()
+
+        self._write_section('info', OrderedDict((
+            ('semester', semester),
+            ('telescope', telescope),
+        )))
+
+    def add(self, project):
+        if project.code in self.codes:
+            raise ValueError(
+                'Section {!r} already exists'.format(project.code))
+
+        self.codes.add(project.code)
+
+        self._write_section(project.code, project_options(project))
+
+    def _write_section(self, section, options):
+        lines = ['[{}]\n'.format(section)]
+
+        for (key, value) in options.items():
+            lines.append('{} = {}\n'.format(key, value.replace('\n', '\n\t')))
+
+        lines.append('\n')
+
+        self.file_.write(''.join(lines))
+
+
+def project_options(project):
+    """
+    Get the options to be written for a project, as an ordered
+    dictionary of strings.
+    """
+
+    options = OrderedDict()
+
+    if project.continuation is not None:
+        options['continuation'] = project.continuation
+
+    if project.country is not None:
+        options['country'] = project.country
+
+    if project.pi is not None:
+        options['pi'] = project.pi
+        options['pi_affiliation'] = project.pi_affiliation
+
+    if project.cois is not None:
+        options['coi'] = ','.join(project.cois)
+        options['coi_affiliation'] = ','.join(project.coi_affiliation)
+
+    if project.title is not None:
+        options['title'] = project.title
+
+    options['band'] = ','.join(str(x) for x in project.bands)
+    options['allocation'] = str(project.allocation)
+    options['tagpriority'] = str(project.tagpriority)
+
+    if project.tagadjustment is not None:
+        options['tagadjustment'] = str(project.tagadjustment)
+
+    if project.support is not None:
+        options['support'] = project.support
+
+    if project.expiry is not None:
+        options['expiry'] = project.expiry.strftime(expiry_format)
+
+    return options
+
+
+def read_project_ini(file_):
+    """
+    Read an OMP project definition file in "ini" format, as written
+    by `write_project_ini`.
+
+    Returns a tuple of the "info" section (as a dictionary) and
+    an ordered dictionary of `Project` namedtuples by project code.
+    """
 
-        if project.country is not None:
-            config.set(code, 'country', project.country)
+    sections = OrderedDict()
+    options = None
+    key = None
 
-        if project.pi is not None:
-            config.set(code, 'pi', project.pi)
-            config.set(code, 'pi_affiliation', project.pi_affiliation)
+    for line in file_:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
 
-        if project.cois is not None:
-            config.set(code, 'coi', ','.join(project.cois))
-            config.set(code, 'coi_affiliation', ','.join(project.coi_affiliation))
+        line = line.rstrip('\r\n')
 
-        if project.title is not None:
-            config.set(code, 'title', project.title)
+        if line[:1] in (' ', '\t'):
+            # Continuation of a multi-line value.
+            if key is not None:
+                options[key] += '\n' + line.strip()
+            continue
 
-        config.set(code, 'band', ','.join(str(x) for x in project.bands))
-        config.set(code, 'allocation', str(project.allocation))
-        config.set(code, 'tagpriority', str(project.tagpriority))
+        key = None
+
+        if (not line) or line.startswith(('#', ';')):
+            continue
+
+        if line.startswith('['):
+            options = sections[line.strip()[1:-1]] = OrderedDict()
+            continue
+
+        if options is None:
+            raise ValueError('Option outside section: {!r}'.format(line))
+
+        (key, value) = line.split('=', 1)
+        key = key.strip().lower()
+        options[key] = value.strip()
+
+    info = sections.pop('info', {})
+
+    return (info, OrderedDict(
+        (code, parse_project(code, options))
+        for (code, options) in sections.items()))
+
+
+def parse_project(code, options):
+    """
+    Construct a `Project` namedtuple from the options of a section
+    of a project definition file.
+    """
+
+    def split_list(value):
+        return [] if value == '' else value.split(',')
+
+    project = null_tuple(Project)._replace(
+        code=code,
+        continuation=options.get('continuation'),
+        country=options.get('country'),
+        pi=options.get('pi'),
+        pi_affiliation=options.get('pi_affiliation'),
+        title=options.get('title'),
+        bands=[int(x) for x in split_list(options.get('band', ''))],
+        allocation=_parse_number(options.get('allocation')),
+        tagpriority=_parse_number(options.get('tagpriority')),
+        tagadjustment=_parse_number(options.get('tagadjustment')),
+        support=options.get('support'),
+    )
+
+    if 'coi' in options:
+        project = project._replace(
+            cois=split_list(options['coi']),
+            coi_affiliation=split_list(options.get('coi_affiliation', '')))
+
+    if 'expiry' in options:
+        project = project._replace(
+            expiry=datetime.strptime(options['expiry'], expiry_format))
+
+    return project
+
+
+def _parse_number(value):
+    if value is None or value == 'None':
+        return None
+
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def diff_projects(old_projects, new_projects):
+    """
+    Compare two sets of projects, as dictionaries of `Project`
+    namedtuples by code.
+
+    Projects are compared by the options which would be written
+    to a project definition file, as they would be read back (i.e.
+    without surrounding white space on each line).
+
+    Returns an ordered dictionary with entries `added` and `removed`,
+    lists of project codes, and `changed`, an ordered dictionary by
+    project code of ordered dictionaries giving the old and new value
+    (or `None` if absent) of each changed option.
+    """
+
+    added = []
+    changed = OrderedDict()
+
+    for (code, project) in new_projects.items():
+        old_project = old_projects.get(code)
+        if old_project is None:
+            added.append(code)
+            continue
+
+        old_options = _options_as_read(old_project)
+        new_options = _options_as_read(project)
+
+        differences = OrderedDict()
+        for key in list(new_options.keys()) + [
+                x for x in old_options.keys() if x not in new_options]:
+            (old_value, new_value) = (
+                old_options.get(key), new_options.get(key))
+            if old_value != new_value:
+                differences[key] = (old_value, new_value)
+
+        if differences:
+            changed[code] = differences
+
+    return OrderedDict((
+        ('added', added),
+        ('removed', [x for x in old_projects.keys() if x not in new_projects]),
+        ('changed', changed),
+    ))
+
+
+def _options_as_read(project):
+    return OrderedDict(
+        (key, '\n'.join(x.strip() for x in value.split('\n')))
+        for (key, value) in project_options(project).items())
+
+
+def write_project_diff(file_, diff):
+    """
+    Write a summary of the differences found by `diff_projects`.
+    """
 
-        if project.tagadjustment is not None:
-            config.set(code, 'tagadjustment', str(project.tagadjustment))
+    for code in diff['added']:
+        print('Added project {}'.format(code), file=file_)
 
-        if project.support is not None:
-            config.set(code, 'support', project.support)
+    for code in diff['removed']:
+        print('Removed project {}'.format(code), file=file_)
 
-        if project.expiry is not None:
-            config.set(
-                code, 'expiry', project.expiry.strftime('%Y-%m-%dT%H:%M:%S'))
+    for (code, differences) in diff['changed'].items():
+        print('Changed project {}'.format(code), file=file_)
 
-    config.write(file_)
+        for (key, (old_value, new_value)) in differences.items():
+            print('    {}: {} -> {}'.format(
+                key,
+                ('(none)' if old_value is None else old_value),
+                ('(none)' if new_value is None else new_value)), file=file_)
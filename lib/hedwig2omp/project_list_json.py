@@ -20,6 +20,7 @@ from __future__ import absolute_import, division, print_function, \
 
 from collections import OrderedDict
 import json
+from tempfile import TemporaryFile
 
 from hedwig.astro.coord import CoordSystem
 from hedwig.facility.jcmt.type import \
@@ -28,6 +29,31 @@ from hedwig.type.collection import ResultCollection
 from hedwig.type.simple import Target
 
 
+enum_name_cache = {}
+
+
+def get_enum_name(enum_class, *value):
+    """
+    Get the name of an enum value, using a cache to avoid repeated lookups.
+
+    Any additional arguments are passed through, so this can also be used
+    for `JCMTInstrument.get_name_with_ancillary`.
+    """
+
+    key = (enum_class, value)
+    name = enum_name_cache.get(key)
+
+    if name is None:
+        if len(value) == 1:
+            name = enum_class.get_name(*value)
+        else:
+            name = enum_class.get_name_with_ancillary(*value)
+
+        enum_name_cache[key] = name
+
+    return name
+
+
 def filter_object(obj_):
     if isinstance(obj_, ResultCollection):
         return [filter_object(x) for x in obj_.values()]
@@ -40,21 +66,20 @@ def filter_object(obj_):
 
     elif isinstance(obj_, JCMTRequest):
         result = obj_._replace(
-            instrument=JCMTInstrument.get_name(obj_.instrument),
+            instrument=get_enum_name(JCMTInstrument, obj_.instrument),
             ancillary=(None if (obj_.ancillary == 0) else
-                       JCMTAncillary.get_name(obj_.ancillary)),
-            weather=JCMTWeather.get_name(obj_.weather),
+                       get_enum_name(JCMTAncillary, obj_.ancillary)),
+            weather=get_enum_name(JCMTWeather, obj_.weather),
         )._asdict()
 
-        result['instrument_ancillary'] = \
-            JCMTInstrument.get_name_with_ancillary(
-                obj_.instrument, obj_.ancillary)
+        result['instrument_ancillary'] = get_enum_name(
+            JCMTInstrument, obj_.instrument, obj_.ancillary)
 
         return result
 
     elif isinstance(obj_, Target):
         return obj_._replace(
-            system=CoordSystem.get_name(obj_.system))._asdict()
+            system=get_enum_name(CoordSystem, obj_.system))._asdict()
 
     elif isinstance(obj_, tuple) and hasattr(obj_, '_asdict'):
         return filter_object(obj_._asdict())
@@ -67,9 +92,134 @@ def default_object(obj_):
     return str(obj_)
 
 
-def write_json_file(file_, proposal_details):
-    json.dump(
-        filter_object(proposal_details), file_,
-        indent=4, separators=(',', ': '),
-        sort_keys=True,
-        default=default_object)
+def write_json_file(file_, proposal_details, format_='indent'):
+    """
+    Write a JSON file containing the given proposal details.
+
+    Each proposal is converted and written in turn.  The `format_`
+    can be "indent" (the default), "compact" or "lines" -- the latter
+    giving JSON Lines output, with one proposal per line.
+    """
+
+    write_json_fragments(file_, (
+        (code, encode_proposal(code, proposal_details[code], format_))
+        for code in sorted(proposal_details.keys())), format_)
+
+
+def encode_proposal(code, proposal_detail, format_='indent'):
+    """
+    Encode the details of a single proposal as a JSON fragment.
+
+    In the default "indent" format, the fragment is indented to match
+    its position within the JSON file.  For the "lines" format, the
+    proposal code is included in the object as `proposal_code`.
+    """
+
+    if format_ == 'indent':
+        return json.dumps(
+            filter_object(proposal_detail),
+            indent=4, separators=(',', ': '),
+            sort_keys=True,
+            default=default_object).replace('\n', '\n    ')
+
+    obj_ = filter_object(proposal_detail)
+
+    if format_ == 'lines':
+        obj_['proposal_code'] = code
+
+    elif format_ != 'compact':
+        raise Exception('Unknown JSON format: {}'.format(format_))
+
+    return json.dumps(
+        obj_, separators=(',', ':'), sort_keys=True, default=default_object)
+
+
+def write_json_fragments(file_, fragments, format_='indent'):
+    """
+    Write a JSON file from an iterable of proposal codes and JSON
+    fragments, as generated by `encode_proposal`, in sorted order.
+    """
+
+    if format_ == 'lines':
+        for (code, fragment) in fragments:
+            file_.write(fragment)
+            file_.write('\n')
+
+        return
+
+    (separator, prefix, suffix) = (
+        (',', '\n    ', ': ') if format_ == 'indent' else (',', '', ':'))
+
+    is_first = True
+    for (code, fragment) in fragments:
+        if is_first:
+            file_.write('{')
+            is_first = False
+        else:
+            file_.write(separator)
+
+        file_.write(prefix)
+        file_.write(json.dumps(code))
+        file_.write(suffix)
+        file_.write(fragment)
+
+    if is_first:
+        file_.write('{}')
+    elif format_ == 'indent':
+        file_.write('\n}')
+    else:
+        file_.write('}')
+
+
+class JSONFragmentSpool(object):
+    """
+    Temporary on-disk store of encoded proposal JSON fragments.
+
+    This allows the proposal details to be converted and released as
+    they are processed.  The `write` method then produces the same
+    output as `write_json_file` would have given for the full set of
+    proposal details.
+    """
+
+    def __init__(self, format_='indent'):
+        self.format_ = format_
+        self.spool = TemporaryFile()
+        self.index = {}
+
+    def add(self, code, proposal_detail):
+        """
+        Encode and store the details of a proposal.
+
+        Returns the encoded fragment.
+        """
+
+        fragment = encode_proposal(code, proposal_detail, self.format_)
+
+        self.add_fragment(code, fragment)
+
+        return fragment
+
+    def add_fragment(self, code, fragment):
+        """
+        Store a fragment previously encoded using the same format.
+        """
+
+        fragment = fragment.encode('ascii')
+
+        self.spool.seek(0, 2)
+        self.index[code] = (self.spool.tell(), len(fragment))
+        self.spool.write(fragment)
+
+    def write(self, file_):
+        write_json_fragments(
+            file_, self._iter_fragments(), self.format_)
+
+    def _iter_fragments(self):
+        for code in sorted(self.index.keys()):
+            (offset, length) = self.index[code]
+            self.spool.seek(offset)
+
+            yield (code, self.spool.read(length).decode('ascii'))
+
+    def close(self):
+        self.spool.close()
@@ -0,0 +1,243 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Server running export commands using a persistent session.
+
+Requests are read from a Unix socket, one per connection, as a single
+line of JSON.  The response is a sequence of JSON lines, each of which
+is an object with one of the following keys:
+
+`stdout`, `stderr`
+    Output text from the command.
+
+`exit`
+    Exit status (the last line of the response).
+
+A request can have the following forms:
+
+`{"command": <name>, "argv": [<argument>...], "cwd": <directory>}`
+    Run one of the commands from `hedwig2omp.command`.
+
+`{"invalidate": [<item>...]}`
+    Discard items from the session (all items if the list is empty).
+
+`{"stop": true}`
+    Shut down the server.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from contextlib import closing
+import json
+import logging
+import os
+import socket
+import sys
+import traceback
+
+from docopt import docopt
+
+from hedwig.util import get_logger
+
+from hedwig2omp.command import get_command, get_log_level, server_commands
+from hedwig2omp.session import Session
+
+logger = get_logger(__name__)
+
+frame_buffer_size = 65536
+
+
+class FrameStream(object):
+    """
+    File-like object sending text written to it as response frames.
+    """
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.buffer = []
+        self.size = 0
+
+    def write(self, text):
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+
+        self.buffer.append(text)
+        self.size += len(text)
+
+        if self.size > frame_buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            send_frame(self.conn, {self.name: ''.join(self.buffer)})
+            self.buffer = []
+            self.size = 0
+
+
+def send_frame(conn, frame):
+    conn.sendall(json.dumps(frame).encode('utf-8') + b'\n')
+
+
+class ExportServer(object):
+    """
+    Server listening on a Unix socket.
+
+    Requests are handled one at a time, since commands are run with
+    the working directory, standard output and logging of the client.
+    """
+
+    def __init__(self, socket_path, session=None):
+        self.socket_path = socket_path
+        self.session = (
+            Session(persistent=True) if session is None else session)
+        self.running = False
+
+    def serve(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        umask = os.umask(0o077)
+        try:
+            sock.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+
+        sock.listen(5)
+        logger.info('Listening on {}', self.socket_path)
+
+        self.running = True
+
+        try:
+            while self.running:
+                (conn, address) = sock.accept()
+
+                try:
+                    self.handle(conn)
+
+                except Exception:
+                    logger.exception('Error handling request')
+
+                finally:
+                    conn.close()
+
+        finally:
+            sock.close()
+            os.unlink(self.socket_path)
+
+    def handle(self, conn):
+        with closing(conn.makefile('rb')) as f:
+            request = json.loads(f.readline().decode('utf-8'))
+
+        if 'command' in request:
+            status = self.run_command(
+                conn, request['command'], request.get('argv', []),
+                request.get('cwd'))
+
+        elif 'invalidate' in request:
+            logger.info(
+                'Invalidating {}', ', '.join(request['invalidate']) or 'all')
+            self.session.invalidate(*request['invalidate'])
+            status = 0
+
+        elif request.get('stop'):
+            logger.info('Stopping')
+            self.running = False
+            status = 0
+
+        else:
+            send_frame(conn, {'stderr': 'Request not recognised\n'})
+            status = 1
+
+        send_frame(conn, {'exit': status})
+
+    def run_command(self, conn, name, argv, cwd):
+        """
+        Run a command with the output and logging sent to the client.
+
+        Returns the exit status.
+        """
+
+        logger.info('Running {}', ' '.join([name] + argv))
+
+        stdout = FrameStream(conn, 'stdout')
+        stderr = FrameStream(conn, 'stderr')
+
+        handler = logging.StreamHandler(stderr)
+        handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+
+        root_logger = logging.getLogger()
+        root_level = root_logger.level
+        root_handlers = root_logger.handlers[:]
+
+        prev_dir = os.getcwd()
+        (sys_stdout, sys_stderr) = (sys.stdout, sys.stderr)
+
+        status = 0
+
+        try:
+            if cwd is not None:
+                os.chdir(cwd)
+
+            sys.stdout = stdout
+            sys.stderr = stderr
+
+            root_logger.handlers = [handler]
+
+            if name not in server_commands:
+                raise SystemExit(
+                    'Command "{}" can not be run by the server'.format(name))
+
+            command = get_command(name)
+            args = docopt(command.__doc__, argv=argv)
+
+            root_logger.setLevel(get_log_level(args))
+
+            command.run(args, self.session)
+
+        except SystemExit as e:
+            if e.code is None:
+                pass
+            elif isinstance(e.code, int):
+                status = e.code
+            else:
+                print(e.code, file=stderr)
+                status = 1
+
+        except Exception:
+            stderr.write(traceback.format_exc())
+            status = 1
+
+            # The error may have been due to a lost connection.
+            self.session.invalidate('db')
+
+        finally:
+            (sys.stdout, sys.stderr) = (sys_stdout, sys_stderr)
+
+            root_logger.handlers = root_handlers
+            root_logger.setLevel(root_level)
+
+            os.chdir(prev_dir)
+
+            stdout.flush()
+            stderr.flush()
+
+        return status
@@ -0,0 +1,141 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from threading import Lock
+
+from hedwig.compat import first_value
+from hedwig.config import get_database, get_facilities
+from hedwig.util import get_logger
+
+from hedwig2omp.config import clear_config, get_config
+from hedwig2omp.user import UserDB
+
+logger = get_logger(__name__)
+
+session_caches = ('config', 'db', 'facilities', 'users')
+
+
+class Session(object):
+    """
+    Connections and lookup tables used by the export commands.
+
+    Each item is created when first required and then kept, so that
+    a long-running process (see `hedwig2omp.server`) can use the same
+    connections and tables for many commands.  The `invalidate` method
+    discards items so that they are loaded again.
+
+    A user lookup table which has already been read can be given,
+    for example when starting a worker process.
+
+    A persistent session (as used by the server) should not be shared
+    with child processes, so commands should not start worker processes
+    when `persistent` is set.
+    """
+
+    def __init__(self, users=None, persistent=False):
+        self.persistent = persistent
+        self._lock = Lock()
+        self._db = None
+        self._facilities = {}
+        self._user_db = None
+        self._users = users
+
+    @property
+    def config(self):
+        return get_config()
+
+    @property
+    def db(self):
+        """
+        Hedwig database object.
+        """
+
+        if self._db is None:
+            logger.debug('Connecting to Hedwig database')
+            self._db = get_database()
+
+        return self._db
+
+    def get_facility(self, facility_spec):
+        """
+        Get the Hedwig facility information (including the view)
+        for the given facility specification.
+        """
+
+        facility_info = self._facilities.get(facility_spec)
+
+        if facility_info is None:
+            logger.debug('Resolving facility {}', facility_spec)
+            facility_info = self._facilities[facility_spec] = first_value(
+                get_facilities(db=self.db, facility_spec=facility_spec))
+
+        return facility_info
+
+    def get_users(self, refresh=False, profiler=None):
+        """
+        Get the dictionary of OMP user IDs by Hedwig person ID.
+
+        This method may be called from a background thread.
+        """
+
+        with self._lock:
+            if (self._users is None) or refresh:
+                logger.debug('Reading user lookup table')
+
+                if self._user_db is None:
+                    self._user_db = UserDB()
+
+                user_db = self._user_db
+                user_db.refresh = refresh
+
+                if profiler is not None:
+                    user_db = profiler.wrap(user_db, 'UserDB')
+
+                self._users = user_db.get_all_users()
+
+            return self._users
+
+    def invalidate(self, *names):
+        """
+        Discard the named items (from `session_caches`),
+        or all items if none are specified.
+        """
+
+        if not names:
+            names = session_caches
+
+        for name in names:
+            if name not in session_caches:
+                raise ValueError('Unknown session item "{}"'.format(name))
+
+        with self._lock:
+            if 'config' in names:
+                clear_config()
+
+            if 'db' in names:
+                self._db = None
+                self._facilities = {}
+
+            if 'facilities' in names:
+                self._facilities = {}
+
+            if 'users' in names:
+                self._user_db = None
+                self._users = None
@@ -0,0 +1,122 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Checks of the startup of the `hedwig2omp` entry point.
+
+This module only uses the standard library, so that it does not itself
+load any of the modules which it checks.
+"""
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+import json
+import os
+import subprocess
+import sys
+from time import time
+
+# Modules which should not be loaded merely to parse the command line.
+startup_heavy_modules = (
+    'hedwig.config',
+    'hedwig.db',
+    'hedwig.facility',
+    'omp.db',
+    'sqlalchemy',
+    'taco',
+    'numpy',
+)
+
+# Time (seconds) allowed for showing the help text.
+startup_budget = 0.5
+
+# Program used to check the modules loaded by a command.
+startup_program = '''
+import json, runpy, sys
+sys.argv = json.loads(sys.argv[1])
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+sys.stdout.write('\\n' + json.dumps(sorted(sys.modules)) + '\\n')
+'''
+
+base_dir = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir)
+
+
+def check_startup(argv, repeat=1):
+    """
+    Run the `hedwig2omp` entry point with the given arguments
+    in a new process, and determine which of the `startup_heavy_modules`
+    it loaded.
+
+    Returns a dictionary giving the command arguments, the shortest time
+    and the heavy modules loaded.
+    """
+
+    script = os.path.join(base_dir, 'scripts', 'hedwig2omp')
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.join(base_dir, 'lib')] +
+        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+
+    times = []
+
+    for i in range(repeat):
+        time_start = time()
+        output = subprocess.check_output([
+            sys.executable, '-c', startup_program,
+            json.dumps([script] + argv)], env=env)
+        times.append(time() - time_start)
+
+    modules = json.loads(
+        output.decode('utf-8').rstrip().rsplit('\n', 1)[-1])
+
+    return OrderedDict((
+        ('argv', argv),
+        ('time', min(times)),
+        ('heavy_modules', sorted(
+            x for x in modules if any(
+                x == y or x.startswith(y + '.')
+                for y in startup_heavy_modules))),
+    ))
+
+
+def get_startup_argvs():
+    """
+    Get the lists of arguments to check: showing the help text for the
+    entry point and for each command.
+    """
+
+    from hedwig2omp.command import commands
+
+    return [['--help']] + [[x, '--help'] for x in commands]
+
+
+def run_startup_benchmark(repeat=3):
+    """
+    Time the startup of the `hedwig2omp` entry point, showing the help
+    text for itself and for each command.
+
+    Returns a list of the results of `check_startup`.
+    """
+
+    return [check_startup(x, repeat=repeat) for x in get_startup_argvs()]
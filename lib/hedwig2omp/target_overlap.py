@@ -0,0 +1,353 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from collections import OrderedDict
+import json
+
+import numpy as np
+
+from hedwig.astro.coord import CoordSystem
+from hedwig.file.csv import CSVWriter
+from hedwig.util import get_logger
+
+logger = get_logger(__name__)
+
+# Rotation from FK5 (J2000) to ICRS: the transpose of the frame bias matrix.
+fk5_to_icrs = np.array([
+    [0.9999999999999942, 7.078279744e-8, -8.056217380e-8],
+    [-7.078279478e-8, 0.9999999999999969, 3.306041454e-8],
+    [8.056217614e-8, -3.306040884e-8, 0.9999999999999962],
+]).T
+
+# Rotation from FK4 (B1950) to FK5 (J2000), assuming zero proper motion,
+# applied after removing the E-terms of aberration.
+fk4_to_fk5 = np.array([
+    [0.9999256782, -0.0111820611, -0.0048579477],
+    [0.0111820610, 0.9999374784, -0.0000271765],
+    [0.0048579479, -0.0000271474, 0.9999881997],
+])
+
+fk4_e_terms = np.array([-1.62557e-6, -0.31919e-6, -0.13843e-6])
+
+# Rotation from Galactic coordinates to ICRS: the transpose of the
+# ICRS to Galactic matrix (Hipparcos definition).
+galactic_to_icrs = np.array([
+    [-0.0548755604162154, -0.8734370902348850, -0.4838350155487132],
+    [0.4941094278755837, -0.4448296299600112, 0.7469822444972189],
+    [-0.8676661490190047, -0.1980763734312015, 0.4559837761750669],
+]).T
+
+system_to_icrs = {
+    CoordSystem.ICRS: None,
+    CoordSystem.FK5: fk5_to_icrs,
+    CoordSystem.FK4: fk5_to_icrs.dot(fk4_to_fk5),
+    CoordSystem.GAL: galactic_to_icrs,
+}
+
+
+def to_unit_vectors(x, y):
+    """
+    Convert arrays of longitude and latitude (degrees) to unit vectors.
+    """
+
+    x = np.radians(x)
+    y = np.radians(y)
+    cos_y = np.cos(y)
+
+    return np.column_stack((cos_y * np.cos(x), cos_y * np.sin(x), np.sin(y)))
+
+
+def from_unit_vectors(vectors):
+    """
+    Convert unit vectors to arrays of longitude and latitude (degrees).
+    """
+
+    x = np.degrees(np.arctan2(vectors[:, 1], vectors[:, 0])) % 360.0
+    y = np.degrees(np.arcsin(np.clip(vectors[:, 2], -1.0, 1.0)))
+
+    return (x, y)
+
+
+def to_icrs(x, y, system):
+    """
+    Convert arrays of coordinates in the given (Hedwig) coordinate systems
+    to unit vectors in ICRS.
+
+    Coordinates in systems which are not recognised are set to NaN.
+    """
+
+    vectors = to_unit_vectors(x, y)
+
+    for value in np.unique(system):
+        mask = (system == value)
+
+        if value not in system_to_icrs:
+            logger.warning('Coordinate system {} not recognised', value)
+            vectors[mask] = np.nan
+            continue
+
+        matrix = system_to_icrs[value]
+        if matrix is None:
+            continue
+
+        selected = vectors[mask]
+
+        if value == CoordSystem.FK4:
+            selected = (
+                selected - fk4_e_terms +
+                selected.dot(fk4_e_terms)[:, np.newaxis] * selected)
+
+        selected = selected.dot(matrix.T)
+
+        vectors[mask] = selected / np.sqrt(
+            (selected ** 2).sum(axis=1))[:, np.newaxis]
+
+    return vectors
+
+
+def find_close_pairs(vectors, tolerance):
+    """
+    Find pairs of positions (unit vectors) separated by no more than
+    the given tolerance (degrees).
+
+    The positions are sorted by declination, and each is compared only
+    with the following positions within the tolerance in declination,
+    determined by a binary search of the sorted values.
+
+    Returns arrays of the indices of the first and second position
+    of each pair and their separation (degrees).
+    """
+
+    n = len(vectors)
+    if n < 2:
+        empty = np.zeros(0, dtype=np.intp)
+        return (empty, empty, np.zeros(0))
+
+    z = vectors[:, 2]
+    order = np.argsort(z, kind='mergesort')
+    z_sorted = z[order]
+    vectors_sorted = vectors[order]
+
+    # Search in terms of the z component, which is monotonic with
+    # declination, allowing the tolerance at the extreme declination.
+    dec = np.arcsin(np.clip(z_sorted, -1.0, 1.0))
+    z_max = np.sin(np.minimum(dec + np.radians(tolerance), np.pi / 2))
+    end = np.searchsorted(z_sorted, z_max, side='right')
+    width = end - np.arange(n)
+
+    max_chord = 2.0 * np.sin(np.radians(tolerance) / 2.0)
+
+    first = []
+    second = []
+    separation = []
+
+    for offset in range(1, width.max()):
+        i = np.nonzero(width > offset)[0]
+        j = i + offset
+
+        chord = np.sqrt(
+            ((vectors_sorted[i] - vectors_sorted[j]) ** 2).sum(axis=1))
+        close = (chord <= max_chord)
+
+        first.append(order[i[close]])
+        second.append(order[j[close]])
+        separation.append(np.degrees(2.0 * np.arcsin(chord[close] / 2.0)))
+
+    if not first:
+        empty = np.zeros(0, dtype=np.intp)
+        return (empty, empty, np.zeros(0))
+
+    return (np.concatenate(first), np.concatenate(second),
+            np.concatenate(separation))
+
+
+def group_pairs(n, first, second):
+    """
+    Group positions connected by pairs.
+
+    Returns an array giving a group number for each position, or -1 for
+    positions not in any pair.  Groups are numbered from zero in order
+    of their first position.
+    """
+
+    labels = np.arange(n)
+
+    # Propagate the lowest index through each connected group.
+    while True:
+        previous = labels.copy()
+        lowest = np.minimum(labels[first], labels[second])
+        np.minimum.at(labels, first, lowest)
+        np.minimum.at(labels, second, lowest)
+        labels = labels[labels]
+
+        if np.array_equal(labels, previous):
+            break
+
+    counts = np.bincount(labels, minlength=n)
+    in_group = (counts[labels] > 1)
+
+    groups = np.full(n, -1, dtype=np.intp)
+    (roots, numbers) = np.unique(labels[in_group], return_inverse=True)
+    groups[in_group] = numbers
+
+    return groups
+
+
+class TargetTable(object):
+    """
+    Targets of all projects, with coordinates converted to ICRS.
+
+    Targets without coordinates are omitted.  The `groups` array gives,
+    for each target, the number of the group of targets (within and
+    across projects) lying within the tolerance (arcseconds) of each other,
+    or -1 if there are no other such targets.
+    """
+
+    def __init__(self, targets, tolerance):
+        self.codes = []
+        self.names = []
+        code_index = []
+        x = []
+        y = []
+        system = []
+
+        for (proposal_code, proposal_targets) in targets.items():
+            index = len(self.codes)
+            self.codes.append(proposal_code)
+
+            for target in proposal_targets.values():
+                if ((target.x is None) or (target.y is None) or
+                        (target.system is None)):
+                    continue
+
+                self.names.append(target.name)
+                code_index.append(index)
+                x.append(target.x)
+                y.append(target.y)
+                system.append(target.system)
+
+        self.code_index = np.array(code_index, dtype=np.intp)
+
+        vectors = to_icrs(
+            np.array(x, dtype=float), np.array(y, dtype=float),
+            np.array(system, dtype=int))
+
+        (self.ra, self.dec) = from_unit_vectors(vectors)
+
+        valid = np.nonzero(np.isfinite(vectors[:, 0]))[0]
+        (first, second, separation) = find_close_pairs(
+            vectors[valid], tolerance / 3600.0)
+
+        self.pairs = (valid[first], valid[second], separation * 3600.0)
+        self.groups = group_pairs(len(self.names), *self.pairs[:2])
+
+        logger.debug(
+            'Found {} group(s) of duplicate targets',
+            (self.groups.max() + 1) if len(self.groups) else 0)
+
+    def iter_groups(self):
+        """
+        Iterate over the groups of duplicate targets.
+
+        Yields tuples of the group number and an array of the indices
+        of its targets.
+        """
+
+        in_group = np.nonzero(self.groups >= 0)[0]
+        order = in_group[np.argsort(self.groups[in_group], kind='mergesort')]
+        boundaries = np.nonzero(np.diff(self.groups[order]))[0] + 1
+
+        for members in np.split(order, boundaries):
+            if len(members):
+                yield (int(self.groups[members[0]]), members)
+
+
+def write_normalized_target_file(file_, table):
+    """
+    Write a JSON file listing the targets for each project, in the
+    same format as `write_target_file`, but with ICRS coordinates and
+    the number of the group of duplicate targets (if any).
+    """
+
+    target_objects = OrderedDict()
+    system_name = CoordSystem.get_name(CoordSystem.ICRS)
+
+    for i in range(len(table.names)):
+        if not np.isfinite(table.ra[i]):
+            continue
+
+        target_object = OrderedDict((
+            ('name', table.names[i]),
+            ('x', round(float(table.ra[i]), 8)),
+            ('y', round(float(table.dec[i]), 8)),
+            ('system', system_name),
+        ))
+
+        if table.groups[i] >= 0:
+            target_object['duplicate'] = int(table.groups[i])
+
+        target_objects.setdefault(
+            table.codes[table.code_index[i]], []).append(target_object)
+
+    json.dump(target_objects, file_, indent=4, separators=(',', ': '))
+
+    print('', file=file_)
+
+
+def write_overlap_report(file_, table):
+    """
+    Write a CSV file listing the groups of duplicate targets.
+
+    The separation is given from the first target of each group.
+    """
+
+    writer = CSVWriter()
+
+    writer.add_row([
+        'Group',
+        'Projects in group',
+        'Project',
+        'Target',
+        'RA (ICRS)',
+        'Dec (ICRS)',
+        'Separation (arcsec)',
+    ])
+
+    vectors = to_unit_vectors(table.ra, table.dec)
+
+    for (group, members) in table.iter_groups():
+        n_code = len(np.unique(table.code_index[members]))
+
+        chord = np.sqrt(
+            ((vectors[members] - vectors[members[0]]) ** 2).sum(axis=1))
+        separation = np.degrees(2.0 * np.arcsin(chord / 2.0)) * 3600.0
+
+        for (i, sep) in zip(members, separation):
+            writer.add_row([
+                group,
+                n_code,
+                table.codes[table.code_index[i]],
+                table.names[i],
+                '{:.6f}'.format(table.ra[i]),
+                '{:.6f}'.format(table.dec[i]),
+                '{:.2f}'.format(sep),
+            ])
+
+    file_.write(writer.get_csv())
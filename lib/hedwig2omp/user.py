@@ -18,28 +18,115 @@
 from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
+from collections import OrderedDict
 from contextlib import closing
+import os
+import sqlite3
+from time import time
+
+from hedwig.util import get_logger
 
 from omp.db.db import OMPDB
 from omp.siteconfig import get_omp_siteconfig
 
+from hedwig2omp.config import get_config, get_path
+
+logger = get_logger(__name__)
+
+snapshot_schema = (
+    'CREATE TABLE IF NOT EXISTS user ('
+    ' hedwig_id INTEGER PRIMARY KEY,'
+    ' omp_id VARCHAR(255))',
+    'CREATE TABLE IF NOT EXISTS snapshot ('
+    ' refreshed REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS reload ('
+    ' reloaded REAL NOT NULL)',
+)
+
+default_reload_ttl = 86400
+
 
 class UserDB(object):
-    def __init__(self):
-        cfg = get_omp_siteconfig()
+    """
+    Access to the Hedwig-to-OMP user mapping table.
 
-        self.db = OMPDB(
-            server=cfg.get('database', 'server'),
-            user=cfg.get('database', 'user'),
-            password=cfg.get('database', 'password'))
+    If the configuration file has a `user_cache` section giving a `file`,
+    a local SQLite snapshot of the table (see `doc/schema.sql`) is used
+    by `get_all_users`.  This is refreshed when older than the `ttl`
+    (in seconds).  Since entries are normally only added to the table,
+    a refresh fetches only new entries.  The snapshot is reloaded in full
+    when older than the `reload_ttl` (in seconds, default one day),
+    so that changed and deleted entries are also picked up, or if
+    `refresh` is specified.
+    """
 
+    def __init__(self, refresh=False):
+        self._db = None
         self.placeholder = '%s'
+        self.refresh = refresh
+
+        config = get_config()
+
+        self.snapshot_file = None
+        self.snapshot_ttl = 0
+        self.snapshot_reload_ttl = default_reload_ttl
+        if config.has_option('user_cache', 'file'):
+            self.snapshot_file = get_path(config.get('user_cache', 'file'))
+
+            if config.has_option('user_cache', 'ttl'):
+                self.snapshot_ttl = config.getint('user_cache', 'ttl')
+
+            if config.has_option('user_cache', 'reload_ttl'):
+                self.snapshot_reload_ttl = config.getint(
+                    'user_cache', 'reload_ttl')
+
+    @property
+    def db(self):
+        if self._db is None:
+            cfg = get_omp_siteconfig()
+
+            self._db = OMPDB(
+                server=cfg.get('database', 'server'),
+                user=cfg.get('database', 'user'),
+                password=cfg.get('database', 'password'))
+
+        return self._db
 
     def get_all_users(self):
+        if self.snapshot_file is None:
+            return self._get_all_users_remote()
+
+        with closing(self._open_snapshot()) as conn:
+            (refreshed,) = conn.execute(
+                'SELECT MAX(refreshed) FROM snapshot').fetchone()
+            (reloaded,) = conn.execute(
+                'SELECT MAX(reloaded) FROM reload').fetchone()
+
+            now = time()
+
+            if self.refresh or (reloaded is None) or (
+                    (now - reloaded) > self.snapshot_reload_ttl):
+                self._refresh_snapshot(conn, full=True)
+                self.refresh = False
+
+            elif (refreshed is None) or (
+                    (now - refreshed) > self.snapshot_ttl):
+                self._refresh_snapshot(conn)
+
+            return dict(conn.execute('SELECT hedwig_id, omp_id FROM user'))
+
+    def _get_all_users_remote(self, min_hedwig_id=None):
         result = {}
 
         with self.db.db.transaction() as c:
-            c.execute('SELECT hedwig_id, omp_id FROM omp.omphedwiguser')
+            if min_hedwig_id is None:
+                c.execute('SELECT hedwig_id, omp_id FROM omp.omphedwiguser')
+            else:
+                c.execute(
+                    'SELECT hedwig_id, omp_id FROM omp.omphedwiguser'
+                    ' WHERE hedwig_id > {}'.format(self.placeholder),
+                    (min_hedwig_id,))
+
             while True:
                 row = c.fetchone()
                 if row is None:
@@ -49,9 +136,169 @@ class UserDB(object):
 
         return result
 
+    def _open_snapshot(self):
+        dir_ = os.path.dirname(self.snapshot_file)
+        if dir_ and not os.path.exists(dir_):
+            os.makedirs(dir_)
+
+        conn = sqlite3.connect(self.snapshot_file)
+
+        # Create any tables which do not exist, including those added
+        # since the snapshot was created.
+        with conn:
+            for statement in snapshot_schema:
+                conn.execute(statement)
+
+        return conn
+
+    def _refresh_snapshot(self, conn, full=False):
+        """
+        Update the local snapshot of the user table.
+
+        Unless a full reload is requested, only new entries (beyond the
+        highest Hedwig ID in the snapshot) are fetched.  The snapshot is
+        then reloaded in full if the number of entries still differs
+        from the remote table.
+        """
+
+        now = time()
+
+        with conn:
+            if not full:
+                (max_local,) = conn.execute(
+                    'SELECT MAX(hedwig_id) FROM user').fetchone()
+
+                new_users = self._get_all_users_remote(
+                    min_hedwig_id=(-1 if max_local is None else max_local))
+                logger.debug(
+                    'Adding {} user(s) to snapshot', len(new_users))
+                conn.executemany(
+                    'INSERT OR REPLACE INTO user (hedwig_id, omp_id)'
+                    ' VALUES (?, ?)', new_users.items())
+
+                with self.db.db.transaction() as c:
+                    c.execute('SELECT COUNT(*) FROM omp.omphedwiguser')
+                    (n_remote,) = c.fetchone()
+
+                (n_local,) = conn.execute(
+                    'SELECT COUNT(*) FROM user').fetchone()
+
+                if n_local != n_remote:
+                    logger.debug('User snapshot differs in number of entries')
+                    full = True
+
+            if full:
+                users = self._get_all_users_remote()
+
+                logger.debug('Reloading user snapshot ({} users)', len(users))
+
+                conn.execute('DELETE FROM user')
+                conn.executemany(
+                    'INSERT INTO user (hedwig_id, omp_id) VALUES (?, ?)',
+                    users.items())
+
+                conn.execute('DELETE FROM reload')
+                conn.execute(
+                    'INSERT INTO reload (reloaded) VALUES (?)', (now,))
+
+            conn.execute('DELETE FROM snapshot')
+            conn.execute(
+                'INSERT INTO snapshot (refreshed) VALUES (?)', (now,))
+
     def add_user(self, hedwig_id, omp_id):
         with self.db.db.transaction(read_write=True) as c:
             c.execute(
                 'INSERT INTO omp.omphedwiguser (hedwig_id, omp_id)'
                 ' VALUES ({0}, {0})'.format(self.placeholder),
                 (hedwig_id, omp_id))
+
+        self._add_users_snapshot(((hedwig_id, omp_id),))
+
+    def add_users(self, pairs):
+        """
+        Add multiple entries to the user table in a single transaction.
+
+        `pairs` should be an iterable of `(hedwig_id, omp_id)` tuples.
+        Entries which are already present (with the same OMP ID) are
+        skipped, as are entries which conflict with an existing mapping.
+        If different OMP IDs are given for the same Hedwig ID, none of
+        them are added.
+
+        Returns a tuple of lists: added pairs, skipped pairs and conflicts
+        in the form `(hedwig_id, omp_id, existing_omp_id)`, where the
+        existing OMP ID is that in the database, or `None` for conflicts
+        within the given pairs.
+        """
+
+        new = OrderedDict()
+        added = []
+        skipped = []
+        conflicts = []
+
+        for (hedwig_id, omp_id) in pairs:
+            omp_ids = new.setdefault(hedwig_id, [])
+            if omp_id in omp_ids:
+                skipped.append((hedwig_id, omp_id))
+            else:
+                omp_ids.append(omp_id)
+
+        if not new:
+            return (added, skipped, conflicts)
+
+        with self.db.db.transaction(read_write=True) as c:
+            c.execute(
+                'SELECT hedwig_id, omp_id FROM omp.omphedwiguser'
+                ' WHERE hedwig_id IN ({})'.format(
+                    ', '.join(self.placeholder for x in new)),
+                list(new.keys()))
+
+            existing = {}
+            while True:
+                row = c.fetchone()
+                if row is None:
+                    break
+
+                existing[row[0]] = row[1]
+
+            for (hedwig_id, omp_ids) in new.items():
+                existing_omp_id = existing.get(hedwig_id)
+
+                if existing_omp_id is not None:
+                    for omp_id in omp_ids:
+                        if omp_id == existing_omp_id:
+                            skipped.append((hedwig_id, omp_id))
+                        else:
+                            conflicts.append(
+                                (hedwig_id, omp_id, existing_omp_id))
+
+                elif len(omp_ids) > 1:
+                    for omp_id in omp_ids:
+                        conflicts.append((hedwig_id, omp_id, None))
+
+                else:
+                    added.append((hedwig_id, omp_ids[0]))
+
+            if added:
+                c.executemany(
+                    'INSERT INTO omp.omphedwiguser (hedwig_id, omp_id)'
+                    ' VALUES ({0}, {0})'.format(self.placeholder),
+                    added)
+
+        self._add_users_snapshot(added)
+
+        return (added, skipped, conflicts)
+
+    def _add_users_snapshot(self, pairs):
+        """
+        Write new entries through to the local snapshot, if it exists.
+        """
+
+        if (self.snapshot_file is None) or not os.path.exists(
+                self.snapshot_file):
+            return
+
+        with closing(self._open_snapshot()) as conn:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO user (hedwig_id, omp_id)'
+                    ' VALUES (?, ?)', pairs)
@@ -0,0 +1,77 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase
+
+import numpy as np
+
+from hedwig2omp.affiliation_x_match import AffiliationCrossMatch
+from hedwig2omp.columnar import get_table_filename
+
+
+class AffiliationCrossMatchTestCase(TestCase):
+    def setUp(self):
+        self.dir_ = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_)
+
+    def test_columnar_unmapped(self):
+        # Two proposals: the first has a CoI with no affiliation (code -1)
+        # and the second a PI with no affiliation.
+        np.savez(
+            get_table_filename(self.dir_, 'proposals'),
+            state=np.array([0, 0], dtype=np.int16),
+            state_names=np.array(['Accepted'], dtype=np.str_),
+            semester_code=np.array([0, 0], dtype=np.int16),
+            semester_code_names=np.array(['26A'], dtype=np.str_))
+
+        np.savez(
+            get_table_filename(self.dir_, 'members'),
+            proposal=np.array([0, 0, 0, 1, 1], dtype=np.int32),
+            pi=np.array([1, 0, 0, 1, 0], dtype=np.int8),
+            student=np.array([0, 0, 1, 0, 0], dtype=np.int8),
+            person_name=np.array(
+                ['A', 'B', 'C', 'D', 'E'], dtype=np.str_),
+            affiliation_name=np.array([0, -1, 1, -1, 0], dtype=np.int16),
+            affiliation_name_names=np.array(['UK', 'Japan'], dtype=np.str_))
+
+        x_match = AffiliationCrossMatch()
+        x_match.add_columnar(self.dir_)
+
+        self.assertEqual(x_match.semesters, ['26A'])
+        self.assertEqual(
+            sorted(x_match.affiliation_names), ['Japan', 'UK', 'Unknown'])
+
+        order = x_match.sorted_affiliations()
+        self.assertEqual(
+            [x_match.affiliation_names[x] for x in order],
+            ['Japan', 'UK', 'Unknown'])
+
+        counts = x_match.counts()
+        index = x_match.affiliation_index
+
+        self.assertEqual(counts.shape, (1, 3, 3))
+        self.assertEqual(counts.sum(), 3)
+        self.assertEqual(counts[0, index['UK'], index['Unknown']], 1)
+        self.assertEqual(counts[0, index['UK'], index['Japan']], 1)
+        self.assertEqual(counts[0, index['Unknown'], index['UK']], 1)
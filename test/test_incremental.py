@@ -0,0 +1,147 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+import os
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase
+
+from hedwig2omp.incremental import ExportManifest, OutputSlices
+
+
+class IncrementalTestCase(TestCase):
+    def setUp(self):
+        self.dir_ = mkdtemp()
+        self.manifest_file = os.path.join(self.dir_, 'manifest.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir_)
+
+    def _export(self, inputs, outputs):
+        """
+        Simulate an incremental export in the manner of `export_proj_def`.
+
+        `inputs` is a list of (code, input) tuples and `outputs` is a
+        dictionary of the projects which would be computed for each code.
+
+        Returns the list of projects and a list of the codes which
+        were computed rather than reused.
+        """
+
+        manifest = ExportManifest(self.manifest_file)
+        manifest.set_context('context')
+
+        proposals = []
+        continuation_proposals = []
+        output_slices = OutputSlices(proposals, continuation_proposals)
+        computed = []
+
+        for (code, input_) in inputs:
+            output_slices.stop()
+
+            entry = manifest.lookup(code, input_)
+
+            if entry is not None:
+                proposals.extend(entry['project'])
+                continuation_proposals.extend(entry['continuation'])
+                continue
+
+            output_slices.start(code)
+            computed.append(code)
+
+            proposals.extend(outputs[code])
+
+        for (code, (project, continuation)) in \
+                output_slices.pop_slices().items():
+            manifest.record(code, {
+                'project': project,
+                'continuation': continuation,
+            })
+
+        manifest.save()
+
+        return (proposals, computed)
+
+    def test_output_slices(self):
+        proposals = []
+        continuations = []
+        slices = OutputSlices(proposals, continuations)
+
+        slices.start('A')
+        proposals.extend(['A1', 'A2'])
+        slices.stop()
+
+        # Entries appended between proposals (e.g. reused from the
+        # manifest) must not be included.
+        proposals.append('B1')
+
+        slices.start('C')
+        continuations.append('C1')
+        slices.start('D')
+        proposals.append('D1')
+
+        self.assertEqual(list(slices.pop_slices().items()), [
+            ('A', [['A1', 'A2'], []]),
+            ('C', [[], ['C1']]),
+            ('D', [['D1'], []]),
+        ])
+
+        self.assertEqual(slices.pop_slices(), {})
+
+    def test_mixed_reuse(self):
+        outputs = {
+            'A': ['project A'],
+            'B': ['project B'],
+            'C': ['project C'],
+            'D': ['project D'],
+        }
+
+        (proposals, computed) = self._export(
+            [('A', 1), ('B', 1), ('C', 1), ('D', 1)], outputs)
+
+        self.assertEqual(
+            proposals, ['project A', 'project B', 'project C', 'project D'])
+        self.assertEqual(computed, ['A', 'B', 'C', 'D'])
+
+        # Change A and C, so that each is followed by a reused proposal.
+        outputs['A'] = ['project A (changed)']
+        outputs['C'] = ['project C (changed)']
+
+        (proposals, computed) = self._export(
+            [('A', 2), ('B', 1), ('C', 2), ('D', 1)], outputs)
+
+        self.assertEqual(computed, ['A', 'C'])
+        self.assertEqual(proposals, [
+            'project A (changed)', 'project B',
+            'project C (changed)', 'project D'])
+
+        # Export again with no changes: the reused entries must not
+        # include the projects of the following proposals.
+        (proposals, computed) = self._export(
+            [('A', 2), ('B', 1), ('C', 2), ('D', 1)], outputs)
+
+        self.assertEqual(computed, [])
+        self.assertEqual(proposals, [
+            'project A (changed)', 'project B',
+            'project C (changed)', 'project D'])
+
+        manifest = ExportManifest(self.manifest_file)
+        self.assertEqual(
+            sorted(manifest.project_hashes.keys()), ['A', 'B', 'C', 'D'])
@@ -0,0 +1,44 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+from __future__ import absolute_import, division, print_function, \
+    unicode_literals
+
+from unittest import TestCase
+
+from hedwig2omp.startup import \
+    check_startup, get_startup_argvs, startup_budget
+
+
+class StartupTestCase(TestCase):
+    def test_startup(self):
+        """
+        Check that showing the help text for the entry point and each
+        command does not load heavy modules and is within the budget.
+        """
+
+        for argv in get_startup_argvs():
+            result = check_startup(argv, repeat=3)
+
+            self.assertEqual(
+                result['heavy_modules'], [],
+                'heavy modules loaded by hedwig2omp {}'.format(
+                    ' '.join(argv)))
+
+            self.assertLessEqual(
+                result['time'], startup_budget,
+                'startup time of hedwig2omp {}'.format(' '.join(argv)))